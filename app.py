@@ -2,22 +2,45 @@ import os
 from dotenv import load_dotenv
 load_dotenv()
 
-from flask import session
+from flask import Response, jsonify, request, session
 from dash import Dash, html, dcc
 import dash
 
 from utils.db import init_db
+from utils.metrics import instrument, render as render_metrics
 
 app = Dash(__name__, use_pages=True, suppress_callback_exceptions=True, title="The $100 Question")
 server = app.server
 server.secret_key = os.getenv("SECRET_KEY", "dev-secret")
 
+# time every page callback (phases, response bytes) for /metrics
+instrument()
+
 # init DB tables (safe if exist)
 try:
     init_db()
 except Exception as e:
     print(f"[auth] DB init skipped: {e}")
 
+@server.route("/api/symbols")
+def api_symbols():
+    """Paginated symbol search: /api/symbols?q=app&page=0&size=50 (signed-in users only)."""
+    if not session.get("user"):
+        return jsonify(error="login required"), 401
+    from utils.registry import PAGE_SIZE, search
+    page = request.args.get("page", 0, type=int)
+    size = min(request.args.get("size", PAGE_SIZE, type=int), 500)
+    records, total = search(request.args.get("q", ""), page=page, page_size=size)
+    return jsonify(symbols=records, total=total, page=page, size=size)
+
+@server.route("/metrics")
+def metrics():
+    """Prometheus scrape endpoint; set METRICS_TOKEN to require 'Authorization: Bearer <token>'."""
+    token = os.getenv("METRICS_TOKEN")
+    if token and request.headers.get("Authorization") != f"Bearer {token}":
+        return Response("unauthorized\n", status=401, mimetype="text/plain")
+    return Response(render_metrics(), mimetype="text/plain; version=0.0.4")
+
 def header():
     user = session.get("user")
 
@@ -50,6 +73,7 @@ def header():
             dcc.Link("The $100 Question", href="/hundred", className="nav-link"),
             dcc.Link("Daily Trading Activity", href="/activity", className="nav-link"),
             dcc.Link("Volatility", href="/volatility", className="nav-link"),
+            dcc.Link("Correlation", href="/correlation", className="nav-link"),
         ]
 
     # Right side: profile menu (authed) or auth buttons (anon)
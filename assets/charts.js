@@ -0,0 +1,11 @@
+// Clientside helpers shared by the chart pages.
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    charts: {
+        // Rendered width of the element ``id`` in pixels; sets the server's point budget
+        // (utils.downsample.budget_px). Falls back to the window before layout.
+        width: function (id) {
+            var el = document.getElementById(id);
+            return el ? el.offsetWidth : window.innerWidth;
+        },
+    },
+});
@@ -0,0 +1,73 @@
+// Clientside figure for /hundred (pages/hundred_question.py).
+// The server sends each ticker's downsampled index series once; switching
+// between "index" and "invest" and toggling the log axis are redrawn here
+// without a server round trip. "portfolio" draws the server-side backtest
+// (hq-portfolio) instead.
+function toDates(days) {
+    return days.map(function (d) { return new Date(d * 864e5).toISOString().slice(0, 10); });
+}
+
+function portfolioFigure(p, yType, base) {
+    if (!p) {
+        base.title = {text: "Computing portfolio\u2026"};
+        return {data: [], layout: base};
+    }
+    if (p.message) {
+        base.title = {text: p.message};
+        return {data: [], layout: base};
+    }
+    var x = toDates(p.d);
+    var label = "Portfolio value (USD)";
+    var traces = [{
+        type: "scatter", mode: "lines", name: "Portfolio", x: x, y: p.v,
+        hovertemplate: "Date=%{x}<br>" + label + "=%{y:.2f}<extra></extra>",
+    }];
+    if (p.invested) {
+        traces.push({
+            type: "scatter", mode: "lines", name: "Invested", x: x, y: p.invested,
+            line: {dash: "dot"}, hovertemplate: "Date=%{x}<br>Invested (USD)=%{y:.2f}<extra></extra>",
+        });
+    }
+    base.legend = Object.assign({}, base.legend, {title: {text: ""}});
+    base.yaxis = Object.assign({}, base.yaxis, {title: {text: label}, type: yType});
+    base.uirevision = p.uirevision + "|portfolio";
+    return {data: traces, layout: base};
+}
+
+window.dash_clientside = Object.assign({}, window.dash_clientside, {
+    hundred: {
+        figure: function (data, mode, logValue, portfolio, layout) {
+            var base = JSON.parse(JSON.stringify(layout || {}));
+            if (!data || !data.symbols || !data.symbols.length) {
+                base.title = {text: (data && data.message) || "Select at least one ticker"};
+                return {data: [], layout: base};
+            }
+            var yType = (logValue || []).indexOf("log") >= 0 ? "log" : "linear";
+            if (mode === "portfolio") {
+                return portfolioFigure(portfolio, yType, base);
+            }
+            var invest = mode === "invest";
+            var label = invest ? "Value of $100 (USD)" : "Beginning Index from $100 (USD)";
+
+            var traces = data.symbols.map(function (sym, i) {
+                var s = data.series[i];
+                var x = toDates(s.d);
+                // "invest": $100 at the first point inside the range, i.e. the index rebased
+                var k = invest && s.v.length ? 100 / s.v[0] : 1;
+                var y = k === 1 ? s.v : s.v.map(function (v) { return v * k; });
+                return {
+                    type: "scatter", mode: "lines", name: sym, legendgroup: sym, x: x, y: y,
+                    hovertemplate: "Ticker=" + sym + "<br>Date=%{x}<br>" + label + "=%{y}<extra></extra>",
+                };
+            });
+
+            base.yaxis = Object.assign({}, base.yaxis, {
+                title: {text: label},
+                type: yType,
+            });
+            // keep the user's zoom while finer data or a different series is swapped in
+            base.uirevision = data.uirevision + "|" + mode;
+            return {data: traces, layout: base};
+        },
+    },
+});
@@ -0,0 +1,32 @@
+# Picked up automatically by gunicorn from the working directory.
+import os
+import subprocess
+import sys
+
+
+def when_ready(server):
+    """
+    Build the shared price arena and stale derived series in the background
+    (scripts/precompute.py --arena) while the workers already serve, so boot
+    time does not grow with the universe: until the arena exists workers read
+    prices per symbol and attach it once built, and a symbol requested before
+    its series are saved builds them on first use. With REFRESH_SCHEDULER=1,
+    also run scripts/refresh_prices.py as a sidecar next to the workers.
+    """
+    # a separate process, like the scheduler; niced below the workers
+    server.precompute_proc = subprocess.Popen(
+        [sys.executable, os.path.join("scripts", "precompute.py"), "--arena"], preexec_fn=lambda: os.nice(10))
+    server.log.info(f"arena and derived series build started (pid {server.precompute_proc.pid})")
+    if os.getenv("REFRESH_SCHEDULER", "").lower() not in ("1", "true", "yes"):
+        return
+    # a separate process, not a thread in the master: forked workers must never
+    # inherit locks held mid-refresh
+    server.refresh_proc = subprocess.Popen([sys.executable, os.path.join("scripts", "refresh_prices.py")])
+    server.log.info(f"refresh scheduler started (pid {server.refresh_proc.pid})")
+
+
+def on_exit(server):
+    for name in ("precompute_proc", "refresh_proc"):
+        proc = getattr(server, name, None)
+        if proc is not None and proc.poll() is None:
+            proc.terminate()
@@ -1,56 +1,91 @@
 from dash import html, dcc, register_page, callback, Input, Output
 from flask import session
 import plotly.graph_objects as go
+import numpy as np
 import pandas as pd
+from itertools import cycle
 
-from utils.data import get_ohlc, TICKERS_DEFAULT, DataError
+from utils import indicators
+from utils.analytics import FREQS, auto_freq, bar_bounds, window_bounds
+from utils.data import get_ohlc, get_ohlc_bars, default_bounds, TICKERS_DEFAULT, DataError
+from utils.features import features
+from utils.figcache import FIGURES, Uncached, data_version, day
+from utils.metrics import phase
+from utils.selector import register_search, symbol_dropdown
 
 register_page(__name__, path="/activity", name="Daily Trading Activity")
 
 SEED_TICKER = TICKERS_DEFAULT[0]
-TODAY = pd.Timestamp.today().normalize()
-
-# Try to discover min/max from cached/remote data; otherwise default to a sane 2-month window
-try:
-    _seed = get_ohlc(SEED_TICKER)
-    SEED_MIN, SEED_MAX = _seed["date"].min(), _seed["date"].max()
-except Exception:
-    SEED_MIN, SEED_MAX = TODAY - pd.Timedelta(days=60), TODAY
-
-DEFAULT_END = min(TODAY, SEED_MAX)
-DEFAULT_START = max(SEED_MIN, DEFAULT_END - pd.Timedelta(days=60))
-
-controls = html.Div(
-    id="rk-controls",
-    children=[
-        html.Div(
-            className="control",
-            children=[
-                html.Label("Ticker", htmlFor="rk-ticker"),
-                dcc.Dropdown(
-                    id="rk-ticker",
-                    options=[{"label": t, "value": t} for t in TICKERS_DEFAULT],
-                    value=SEED_TICKER,
-                    clearable=False,
-                ),
-            ],
-        ),
-        html.Div(
-            className="control",
-            children=[
-                html.Label("Date Range", htmlFor="rk-dates"),
-                dcc.DatePickerRange(
-                    id="rk-dates",
-                    min_date_allowed=SEED_MIN,
-                    max_date_allowed=SEED_MAX,
-                    start_date=DEFAULT_START.date(),
-                    end_date=DEFAULT_END.date(),
-                    display_format="MM-DD-YYYY",
-                ),
-            ],
-        ),
-    ],
-)
+SEED_SETS = ["MA"] if "MA" in indicators.INDICATOR_SETS else list(indicators.INDICATOR_SETS)[:1]
+# line colors per spec in a set, in order; bands share one color
+LINE_COLORS = ["#472bbd", "#0a80ed", "#b24b7b", "#e08a00"]
+BAND_COLOR = "#6e897f"
+
+def _controls():
+    today = pd.Timestamp.today().normalize()
+    # Date bounds come from the store's metadata index (no price parsing, no network);
+    # otherwise default to a sane 2-month window
+    seed_min, seed_max = default_bounds([SEED_TICKER], days=60)
+
+    default_end = min(today, seed_max)
+    default_start = max(seed_min, default_end - pd.Timedelta(days=60))
+
+    return html.Div(
+        id="rk-controls",
+        children=[
+            html.Div(
+                className="control",
+                children=[
+                    html.Label("Ticker", htmlFor="rk-ticker"),
+                    symbol_dropdown("rk-ticker", SEED_TICKER, clearable=False),
+                ],
+            ),
+            html.Div(
+                className="control",
+                children=[
+                    html.Label("Date Range", htmlFor="rk-dates"),
+                    dcc.DatePickerRange(
+                        id="rk-dates",
+                        min_date_allowed=seed_min,
+                        max_date_allowed=seed_max,
+                        start_date=default_start.date(),
+                        end_date=default_end.date(),
+                        display_format="MM-DD-YYYY",
+                    ),
+                ],
+            ),
+            html.Div(
+                className="control",
+                children=[
+                    html.Label("Candles", htmlFor="rk-freq"),
+                    dcc.RadioItems(
+                        id="rk-freq",
+                        value="auto",
+                        options=[
+                            {"label": "Auto", "value": "auto"},
+                            {"label": "Daily", "value": "D"},
+                            {"label": "Weekly", "value": "W"},
+                            {"label": "Monthly", "value": "M"},
+                            {"label": "Quarterly", "value": "Q"},
+                        ],
+                        inline=True,
+                    ),
+                ],
+            ),
+            html.Div(
+                className="control",
+                children=[
+                    html.Label("Indicators", htmlFor="rk-indicators"),
+                    dcc.Checklist(
+                        id="rk-indicators",
+                        value=SEED_SETS,
+                        options=[{"label": name, "value": name} for name in indicators.INDICATOR_SETS],
+                        inline=True,
+                    ),
+                ],
+            ),
+        ],
+    )
 
 def _message_figure(msg: str) -> go.Figure:
     fig = go.Figure()
@@ -76,14 +111,14 @@ def layout():
                 className="page",
                 children=[
                     html.H2("Daily Trading Activity"),
-                    html.P("Interactive chart to explore how your investments would fluctuate day-to-day in price. Experience how they react to daily market swings, and visualize highs, lows, opens, and closes, using 20 day moving averages and 50 day moving averages.")
+                    html.P("Interactive chart to explore how your investments would fluctuate day-to-day in price. Experience how they react to daily market swings, and visualize highs, lows, opens, and closes, with 20 and 50 day moving averages, exponential moving averages or Bollinger bands for trend context.")
                 ],
             ),
             html.Section(
                 id="rk-body",
                 className="page",
                 children=[
-                    html.Aside(id="rk-sidebar", children=[controls]),
+                    html.Aside(id="rk-sidebar", children=[_controls()]),
                     html.Section(
                         id="rk-content",
                         children=[
@@ -99,24 +134,86 @@ def layout():
         ],
     )
 
+register_search("rk-ticker")
+
 @callback(
     Output("rk-chart", "figure"),
     Input("rk-ticker", "value"),
     Input("rk-dates", "start_date"),
     Input("rk-dates", "end_date"),
+    Input("rk-freq", "value"),
+    Input("rk-indicators", "value"),
 )
-def update_chart(ticker, start_date, end_date):
+def update_chart(ticker, start_date, end_date, freq, sets):
+    # same inputs + same data version -> same figure; serve it from the figure cache
+    # (open-ended ranges default relative to today, so today is part of their key)
+    today = day(pd.Timestamp.today()) if not start_date or not end_date else None
+    sets = tuple(s for s in indicators.INDICATOR_SETS if s in (sets or ()))
+    key = ("activity", ticker, day(start_date), day(end_date), freq, sets, today, data_version([ticker]))
+    return FIGURES.cached(key, lambda: _figure(ticker, start_date, end_date, freq, sets))
+
+
+def _daily_indicators(ticker, dates, specs):
+    """
+    Columns of ``specs`` for the daily rows at ``dates`` from the precomputed
+    features (utils.features): slices of the full-history series, so the first
+    rows of the window are already averaged over the days before it. Specs the
+    saved series lacks (or all of them, if it does not line up) are left out.
+    """
+    feats = features(ticker)
+    lo, hi = window_bounds(feats.index.values, dates[0], dates[-1])
+    if hi - lo != len(dates) or not np.array_equal(feats.index.values[lo:hi], dates):
+        return {}
+    out = {}
+    for spec in specs:
+        cols = indicators.columns(spec)
+        if set(cols).issubset(feats.columns):
+            out.update({c: feats[c].to_numpy(np.float64)[lo:hi] for c in cols})
+    return out
+
+
+def _indicator_traces(df, specs, unit):
+    """Overlay lines for ``specs`` (columns already in ``df``): bands shaded, averages solid."""
+    traces, colors = [], cycle(LINE_COLORS)
+    for spec in specs:
+        cols, names = indicators.columns(spec), indicators.label(spec, unit)
+        if len(cols) == 1:
+            traces.append(go.Scatter(
+                x=df["date"], y=df[cols[0]], mode="lines", name=names[0],
+                line=dict(width=2.0, color=next(colors)),
+                hovertemplate=f"{names[0]}: %{{y:.2f}}<extra></extra>",
+            ))
+            continue
+        mid, upper, lower = cols
+        traces += [
+            go.Scatter(x=df["date"], y=df[upper], mode="lines", name=names[1], legendgroup=spec,
+                       line=dict(width=1.0, color=BAND_COLOR),
+                       hovertemplate=f"{names[1]}: %{{y:.2f}}<extra></extra>"),
+            go.Scatter(x=df["date"], y=df[lower], mode="lines", name=names[2], legendgroup=spec,
+                       line=dict(width=1.0, color=BAND_COLOR), fill="tonexty",
+                       fillcolor="rgba(110,137,127,0.10)", showlegend=False,
+                       hovertemplate=f"{names[2]}: %{{y:.2f}}<extra></extra>"),
+            go.Scatter(x=df["date"], y=df[mid], mode="lines", name=names[0], legendgroup=spec,
+                       line=dict(width=1.2, color=BAND_COLOR, dash="dot"), showlegend=False,
+                       hovertemplate=f"{names[0]}: %{{y:.2f}}<extra></extra>"),
+        ]
+    return traces
+
+
+def _figure(ticker, start_date, end_date, freq, sets=SEED_SETS):
     # Try to load data for the selected ticker
     try:
-        df = get_ohlc(ticker).copy()
+        with phase("load"):
+            df = get_ohlc(ticker)  # served from the in-process cache; safe to derive from
     except (DataError, Exception):
-        return _message_figure(
+        # not cached: the next request retries the fetch
+        return Uncached(_message_figure(
             "Price data is not available right now. "
             "If you're deploying on Render, consider pre-seeding the data_cache or retry later."
-        )
+        ))
 
     if df.empty or not {"date", "open", "high", "low", "close"}.issubset(df.columns):
-        return _message_figure("No OHLC data available for this ticker/date range.")
+        return Uncached(_message_figure("No OHLC data available for this ticker/date range."))
 
     tmin, tmax = df["date"].min(), df["date"].max()
     # Default to the last ~2 months up to today (but clipped to available data)
@@ -128,57 +225,70 @@ def update_chart(ticker, start_date, end_date):
     end_date = pd.to_datetime(end_date)
     start_date, end_date = max(start_date, tmin), min(end_date, tmax)
 
-    df = df[(df["date"] >= start_date) & (df["date"] <= end_date)].copy()
+    # Long ranges are drawn as weekly/monthly/quarterly candles (auto keeps it under ~300)
+    if freq not in FREQS:
+        freq = auto_freq(start_date, end_date)
+    full = df
+    if freq != "D":
+        with phase("load"):
+            full = get_ohlc_bars(ticker, freq)
+    # binary search on the sorted dates: cost follows the window, not the history;
+    # aggregated candles keep every bar holding a trading day of the range
+    first, last = bar_bounds(full["date"].to_numpy(), df["date"].to_numpy(), freq, start_date, end_date)
+    # only the visible window is drawn; the history before it feeds the indicators
+    df = full.iloc[first:last].copy()
     if df.empty:
-        return _message_figure("No data in the selected range. Try expanding the dates.")
-
-    # Moving averages for trend context (MAs are plotted AFTER candles so they sit on top)
-    df["MA20"] = df["close"].rolling(20).mean()
-    df["MA50"] = df["close"].rolling(50).mean()
-
-    # Y padding so candles don't hug the edges
-    y_min, y_max = float(df["low"].min()), float(df["high"].max())
-    pad = max(1.0, (y_max - y_min) * 0.05)
-
-    candle = go.Candlestick(
-        x=df["date"],
-        open=df["open"], high=df["high"], low=df["low"], close=df["close"],
-        name=ticker,
-        whiskerwidth=0.45,
-        increasing=dict(line=dict(color="#026633", width=1.6)),
-        decreasing=dict(line=dict(color="#bf0940", width=1.6)),
-        showlegend=True,
-    )
-    # Put MAs AFTER the candle so lines are clearly visible above candles
-    ma20 = go.Scatter(
-        x=df["date"], y=df["MA20"], mode="lines", name="MA 20",
-        line=dict(width=2.0, color="#472bbd"),
-        hovertemplate="MA 20: %{y:.2f}<extra></extra>"
-    )
-    ma50 = go.Scatter(
-        x=df["date"], y=df["MA50"], mode="lines", name="MA 50",
-        line=dict(width=2.0, color="#0a80ed"),
-        hovertemplate="MA 50: %{y:.2f}<extra></extra>"
-    )
+        return Uncached(_message_figure("No data in the selected range. Try expanding the dates."))
 
-    fig = go.Figure(data=[candle, ma20, ma50])
-    fig.update_layout(
-        template="plotly_white",
-        hovermode="x unified",
-        margin=dict(l=40, r=20, t=40, b=40),
-        legend=dict(orientation="h", yanchor="bottom", y=1.02, x=0, bgcolor="rgba(255,255,255,.7)"),
-        xaxis=dict(
-            type="date",
-            rangeslider=dict(visible=True, thickness=0.08),
-            showgrid=True, gridcolor="rgba(0,0,0,0.07)",
-            tickformat="%b %Y",
-            rangebreaks=[dict(bounds=["sat", "mon"])],  # hide weekends
-        ),
-        yaxis=dict(
-            title="Price (USD)",
-            range=[y_min - pad, y_max + pad],
-            showgrid=True, gridcolor="rgba(0,0,0,0.07)",
-        ),
-        uirevision="activity",  # preserve zoom when changing props
-    )
+    # Indicators for trend context (plotted AFTER candles so they sit on top); on aggregated
+    # candles windows count bars, e.g. 20 weeks. Daily ones come from the precomputed
+    # full-history features, the rest from a lookback buffer of bars before the window.
+    with phase("compute"):
+        unit = "" if freq == "D" else f" {FREQS[freq]}s"
+        specs = [spec for name in sets for spec in indicators.INDICATOR_SETS.get(name, ())]
+        specs = list(dict.fromkeys(specs))
+        values = _daily_indicators(ticker, df["date"].to_numpy(), specs) if freq == "D" and specs else {}
+        missing = [spec for spec in specs if not set(indicators.columns(spec)).issubset(values)]
+        values.update(indicators.window_values(full["close"].to_numpy(), first, last, missing))
+        for col, v in values.items():
+            df[col] = np.round(v, 4)   # saved as float32; round like the prices themselves
+
+    with phase("figure"):
+        # Y padding so candles don't hug the edges
+        # (bands can reach past the candles, so they count too)
+        lines = list(values.values())
+        y_min = float(np.nanmin(np.concatenate([df["low"].to_numpy(np.float64)] + lines)))
+        y_max = float(np.nanmax(np.concatenate([df["high"].to_numpy(np.float64)] + lines)))
+        pad = max(1.0, (y_max - y_min) * 0.05)
+
+        candle = go.Candlestick(
+            x=df["date"],
+            open=df["open"], high=df["high"], low=df["low"], close=df["close"],
+            name=ticker,
+            whiskerwidth=0.45,
+            increasing=dict(line=dict(color="#026633", width=1.6)),
+            decreasing=dict(line=dict(color="#bf0940", width=1.6)),
+            showlegend=True,
+        )
+        # Put indicators AFTER the candle so lines are clearly visible above candles
+        fig = go.Figure(data=[candle] + _indicator_traces(df, specs, unit))
+        fig.update_layout(
+            template="plotly_white",
+            hovermode="x unified",
+            margin=dict(l=40, r=20, t=40, b=40),
+            legend=dict(orientation="h", yanchor="bottom", y=1.02, x=0, bgcolor="rgba(255,255,255,.7)"),
+            xaxis=dict(
+                type="date",
+                rangeslider=dict(visible=True, thickness=0.08),
+                showgrid=True, gridcolor="rgba(0,0,0,0.07)",
+                tickformat="%b %Y",
+                rangebreaks=[dict(bounds=["sat", "mon"])],  # hide weekends
+            ),
+            yaxis=dict(
+                title="Price (USD)",
+                range=[y_min - pad, y_max + pad],
+                showgrid=True, gridcolor="rgba(0,0,0,0.07)",
+            ),
+            uirevision="activity",  # preserve zoom when changing props
+        )
     return fig
@@ -0,0 +1,209 @@
+# pages/correlation.py
+from dash import html, dcc, register_page, callback, Input, Output, State
+from flask import session
+import plotly.graph_objects as go
+import numpy as np
+import pandas as pd
+
+from utils.analytics import ANN_FACTOR, window_bounds
+from utils.correlation import corr_matrix, return_panel, rolling_mean_corr, rolling_pair_corr
+from utils.downsample import budget_px, register_width, select
+from utils.figcache import FIGURES, data_version, day
+from utils.metrics import phase
+from utils.selector import register_search, symbol_dropdown
+from utils.data import default_bounds, TICKERS_DEFAULT
+
+register_page(__name__, path="/correlation", name="Correlation")
+
+# the heatmap is one pass of pairwise sums over the range; the rolling view comes
+# from the incremental engine in utils.correlation, cached per window length.
+
+PALETTE = ["#2964b4", "#b24b7b"]
+DIVERGING = [[0.0, "#b24b7b"], [0.5, "#f7f7f7"], [1.0, "#2964b4"]]
+MAX_TICK_LABELS = 40   # beyond this the heatmap axes drop their labels; hover still names the pair
+
+def _controls():
+    t_min, t_max = default_bounds(TICKERS_DEFAULT)
+    default_start = max(t_min, t_max - pd.Timedelta(days=5 * 365))
+    return html.Div(id="corr-controls", children=[
+        html.Div(className="control", children=[
+            html.Label("Tickers", htmlFor="corr-tickers"),
+            symbol_dropdown("corr-tickers", TICKERS_DEFAULT, multi=True),
+        ]),
+        html.Div(className="control", children=[
+            html.Label("Date Range", htmlFor="corr-dates"),
+            dcc.DatePickerRange(
+                id="corr-dates",
+                min_date_allowed=t_min,
+                max_date_allowed=t_max,
+                start_date=default_start.date(),
+                end_date=t_max.date(),
+                display_format="YYYY-MM-DD",
+            ),
+        ]),
+        html.Div(className="control", children=[
+            html.Label("Matrix"),
+            dcc.RadioItems(
+                id="corr-measure",
+                value="corr",
+                options=[
+                    {"label": "Correlation", "value": "corr"},
+                    {"label": "Covariance (annualized)", "value": "cov"},
+                ],
+                inline=True,
+            ),
+        ]),
+        html.Div(className="control", children=[
+            html.Label("Rolling Window (trading days)", htmlFor="corr-window"),
+            dcc.Slider(
+                id="corr-window",
+                min=20, max=250, step=10, value=60,
+                marks={20: "20", 60: "60", 120: "120", 250: "250"},
+                tooltip={"placement": "bottom", "always_visible": False},
+            ),
+        ]),
+    ])
+
+def _page():
+    return html.Div(id="corr-page", children=[
+        html.Section(id="corr-header", children=[
+            html.H2("Correlation"),
+            html.P("See how closely your picks move together. The heatmap shows how every pair of tickers co-moved over the chosen dates; the rolling view tracks the average correlation across your selection, and of the pair you click on, so you can spot when diversification held up and when everything moved as one."),
+        ]),
+        html.Section(id="corr-body", children=[
+            html.Aside(id="corr-sidebar", children=[_controls()]),
+            html.Section(id="corr-content", children=[
+                dcc.Graph(id="corr-heatmap", config={"displayModeBar": "hover"}),
+                dcc.Graph(id="corr-rolling", config={"displayModeBar": "hover"}),
+                dcc.Store(id="corr-px"),   # chart width in pixels, sets the point budget
+            ]),
+        ]),
+    ])
+
+def layout():
+    if not session.get("user"):
+        return dcc.Location(pathname="/login?next=/correlation", id="corr-redirect")
+    return _page()
+
+
+register_search("corr-tickers")
+
+register_width("corr-px", "corr-rolling")
+
+def _empty(title):
+    fig = go.Figure()
+    fig.update_layout(template="plotly_white", title=title)
+    return fig
+
+@callback(
+    Output("corr-heatmap", "figure"),
+    Input("corr-tickers", "value"),
+    Input("corr-dates", "start_date"),
+    Input("corr-dates", "end_date"),
+    Input("corr-measure", "value"),
+)
+def update_heatmap(tickers, start_date, end_date, measure):
+    if not tickers or len(tickers) < 2:
+        return _empty("Select at least two tickers")
+    key = ("corr-heatmap", tuple(tickers), day(start_date), day(end_date), measure, data_version(tickers))
+    return FIGURES.cached_or_message(key, lambda: _heatmap(tickers, start_date, end_date, measure), _empty)
+
+
+def _heatmap(tickers, start_date, end_date, measure):
+    with phase("load"):
+        dates, rets = return_panel(tickers, end_date)
+    with phase("compute"):
+        lo, hi = window_bounds(dates, start_date, end_date)
+        cov, corr = corr_matrix(rets[lo:hi])
+        if measure == "cov":
+            z, zmid, fmt, title = cov * ANN_FACTOR ** 2, 0.0, ".4f", "Annualized Covariance of Daily Returns"
+            bound = float(np.nanmax(np.abs(z))) if np.isfinite(z).any() else 1.0
+            zmin, zmax = -bound, bound
+        else:
+            z, zmid, fmt, title = corr, 0.0, ".2f", "Correlation of Daily Returns"
+            zmin, zmax = -1.0, 1.0
+
+    with phase("figure"):
+        labels = len(tickers) <= MAX_TICK_LABELS
+        fig = go.Figure(go.Heatmap(
+            z=np.round(z, 6).astype(np.float32), x=list(tickers), y=list(tickers),
+            zmin=zmin, zmax=zmax, zmid=zmid, colorscale=DIVERGING,
+            hovertemplate="%{y} / %{x}<br>" + ("Correlation" if measure == "corr" else "Covariance")
+                          + "=%{z:" + fmt + "}<extra></extra>",
+        ))
+        fig.update_layout(
+            template="plotly_white",
+            title=title,
+            margin=dict(l=60, r=20, t=60, b=40),
+            height=max(420, min(900, 18 * len(tickers) + 160)),
+        )
+        fig.update_xaxes(showticklabels=labels, side="bottom")
+        fig.update_yaxes(showticklabels=labels, autorange="reversed", scaleanchor="x")
+    return fig
+
+
+def _pair(tickers, click):
+    """The heatmap cell the user clicked, else the first two tickers."""
+    try:
+        point = click["points"][0]
+        a, b = point["y"], point["x"]
+        if a != b and a in tickers and b in tickers:
+            return a, b
+    except (TypeError, KeyError, IndexError):
+        pass
+    return tickers[0], tickers[1]
+
+@callback(
+    Output("corr-rolling", "figure"),
+    Input("corr-tickers", "value"),
+    Input("corr-dates", "start_date"),
+    Input("corr-dates", "end_date"),
+    Input("corr-window", "value"),
+    Input("corr-heatmap", "clickData"),
+    State("corr-px", "data"),
+)
+def update_rolling(tickers, start_date, end_date, window, click, width_px):
+    if not tickers or len(tickers) < 2:
+        return _empty("Select at least two tickers")
+    pair = _pair(tickers, click)
+    width_px = budget_px(width_px)
+    key = ("corr-rolling", tuple(tickers), day(start_date), day(end_date), window, pair, width_px,
+           data_version(tickers))
+    return FIGURES.cached_or_message(
+        key, lambda: _rolling(tickers, day(start_date), day(end_date), window, pair, width_px), _empty)
+
+
+def _rolling(tickers, start_date, end_date, window, pair, width_px):
+    with phase("load"):
+        dates, rets = return_panel(list(pair), end_date)
+    with phase("compute"):
+        # the mean over the whole selection is the expensive part: the rolling engine
+        # samples one window per ~4 pixels and caches the result per window length
+        mean_dates, mean = (rolling_mean_corr(tickers, window, start_date, end_date, points=width_px // 4)
+                            if len(tickers) > 2 else (None, None))
+        lo, hi = window_bounds(dates, start_date, end_date)
+        pair_corr = rolling_pair_corr(rets[:, 0], rets[:, 1], window)[lo:hi]
+        idx = select(dates[lo:hi], pair_corr, width_px)
+
+    with phase("figure"):
+        fig = go.Figure()
+        if mean is not None:
+            fig.add_trace(go.Scatter(
+                x=pd.to_datetime(mean_dates), y=mean, mode="lines", name=f"Average of {len(tickers)} tickers",
+                line=dict(color=PALETTE[0]), hovertemplate="%{x|%Y-%m-%d}<br>Average=%{y:.2f}<extra></extra>",
+            ))
+        fig.add_trace(go.Scatter(
+            x=pd.to_datetime(dates[lo:hi][idx]), y=pair_corr[idx], mode="lines", name=f"{pair[0]} / {pair[1]}",
+            line=dict(color=PALETTE[1]), hovertemplate="%{x|%Y-%m-%d}<br>%{fullData.name}=%{y:.2f}<extra></extra>",
+        ))
+        fig.update_layout(
+            template="plotly_white",
+            title=f"Rolling {window}-Day Correlation",
+            hovermode="x unified",
+            legend=dict(orientation="h", yanchor="bottom", y=1.02, x=0),
+            margin=dict(l=40, r=20, t=85, b=40),
+            uirevision=f"{tickers}|{start_date}|{end_date}",
+        )
+        fig.update_yaxes(range=[-1, 1], title_text="Correlation", zeroline=True)
+        fig.update_xaxes(title_text="Date")
+    return fig
@@ -69,6 +69,14 @@ def layout():
                                     dcc.Link("Open", href="/volatility", className="btn"),
                                 ],
                             ),
+                            html.Div(
+                                className="card",
+                                children=[
+                                    html.H3("Correlation"),
+                                    html.P("How your picks move together."),
+                                    dcc.Link("Open", href="/correlation", className="btn"),
+                                ],
+                            ),
                         ],
                     )
                 ],
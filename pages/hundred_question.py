@@ -1,168 +1,259 @@
 # pages/hundred_question.py
-from dash import html, dcc, register_page, callback, Input, Output
+from dash import html, dcc, register_page, callback, clientside_callback, ctx, no_update, ClientsideFunction, Input, Output, State
 from flask import session
-import plotly.express as px
+import plotly.graph_objects as go
+import numpy as np
 import pandas as pd
 
-from utils.data import get_prices, normalize_to_100, TICKERS_DEFAULT
+from utils.arena import close_panel, close_window
+from utils.backtest import REBALANCE, backtest, parse_weights
+from utils.data import default_bounds, TICKERS_DEFAULT
+from utils.downsample import budget_px, is_zoom_event, register_width, select, visible_range
+from utils.figcache import FIGURES, data_version, day
+from utils.metrics import phase
+from utils.selector import register_search, symbol_dropdown
 
 register_page(__name__, path="/hundred", name="The $100 Question")
 
-# Pre-load
-PRICES = get_prices(TICKERS_DEFAULT)               # date, close, symbol
-NORM = normalize_to_100(PRICES)                    # date, symbol, norm
-
-controls = html.Div(
-    id="hq-controls",
-    children=[
-        html.Div(
-            className="control",
-            children=[
-                html.Label("Tickers"),
-                dcc.Checklist(
-                    id="hq-tickers",
-                    value=TICKERS_DEFAULT,
-                    options=[{"label": t, "value": t} for t in TICKERS_DEFAULT],
-                    inline=True,
-                ),
-            ],
-        ),
-        html.Div(
-            className="control",
-            children=[
-                html.Label("Date Range"),
-                dcc.DatePickerRange(
-                    id="hq-dates",
-                    min_date_allowed=NORM["date"].min(),
-                    max_date_allowed=NORM["date"].max(),
-                    start_date=NORM["date"].min(),
-                    end_date=NORM["date"].max(),
-                    display_format="MM-DD-YYYY",
-                ),
-            ],
-        ),
-        html.Div(
-            className="control",
-            children=[
-                html.Label("Series"),
-                dcc.RadioItems(
-                    id="hq-series",
-                    value="index",
-                    options=[
-                        {"label": "Index ($100 at first available)", "value": "index"},
-                        {"label": "Invest $100 at range start", "value": "invest"},
-                    ],
-                    inline=True,
-                ),
-            ],
-        ),
-        html.Div(
-            className="control",
-            children=[
-                dcc.Checklist(
-                    id="hq-log",
-                    options=[{"label": "Log scale", "value": "log"}],
-                    value=[],
-                    inline=True,
-                )
-            ],
-        ),
-    ],
-)
+# Prices are sliced lazily by the callback from the shared, memory-mapped arena;
+# the layout only needs the date bounds, which come from the store's metadata index.
 
-_page = html.Div(
-    id="hq-page",
-    className="page",
-    children=[
-        html.Section(id="hq-header", children=[
-            html.H2("Accumulated Investment Returns"),
-            html.P("Interactive chart to explore how your investments would have grown over time. See the value of $100 invested on November 1, 1999 (or any custom start date) and track its growth through your chosen end date.")
-        ]),
-        html.Section(
-            id="hq-body",
-            children=[
-                html.Aside(id="hq-sidebar", children=[controls]),
-                html.Section(
-                    id="hq-content",
-                    children=[dcc.Graph(id="hq-chart", config={"displayModeBar": "hover"})],
-                ),
-            ],
-        ),
-    ],
-)
+def _controls():
+    t_min, t_max = default_bounds(TICKERS_DEFAULT)
+    return html.Div(
+        id="hq-controls",
+        children=[
+            html.Div(
+                className="control",
+                children=[
+                    html.Label("Tickers", htmlFor="hq-tickers"),
+                    symbol_dropdown("hq-tickers", TICKERS_DEFAULT, multi=True),
+                ],
+            ),
+            html.Div(
+                className="control",
+                children=[
+                    html.Label("Date Range"),
+                    dcc.DatePickerRange(
+                        id="hq-dates",
+                        min_date_allowed=t_min,
+                        max_date_allowed=t_max,
+                        start_date=t_min,
+                        end_date=t_max,
+                        display_format="MM-DD-YYYY",
+                    ),
+                ],
+            ),
+            html.Div(
+                className="control",
+                children=[
+                    html.Label("Series"),
+                    dcc.RadioItems(
+                        id="hq-series",
+                        value="index",
+                        options=[
+                            {"label": "Index ($100 at first available)", "value": "index"},
+                            {"label": "Invest $100 at range start", "value": "invest"},
+                            {"label": "Portfolio of the tickers", "value": "portfolio"},
+                        ],
+                        inline=True,
+                    ),
+                ],
+            ),
+            html.Div(
+                className="control",
+                children=[
+                    html.Label("Portfolio weights", htmlFor="hq-weights"),
+                    dcc.Input(id="hq-weights", type="text", debounce=True, value="",
+                              placeholder="e.g. AAPL 60, MSFT 40 (blank = equal weight)"),
+                    html.Label("Rebalance", htmlFor="hq-rebalance"),
+                    dcc.Dropdown(id="hq-rebalance", value="none", clearable=False,
+                                 options=[{"label": v, "value": k} for k, v in REBALANCE.items()]),
+                    html.Label("Monthly contribution (USD)", htmlFor="hq-dca"),
+                    dcc.Input(id="hq-dca", type="number", min=0, step=10, value=0, debounce=True),
+                ],
+            ),
+            html.Div(
+                className="control",
+                children=[
+                    dcc.Checklist(
+                        id="hq-log",
+                        options=[{"label": "Log scale", "value": "log"}],
+                        value=[],
+                        inline=True,
+                    )
+                ],
+            ),
+        ],
+    )
+
+def _base_layout():
+    """Static figure layout for the clientside renderer (template expanded once per page load)."""
+    return go.Layout(
+        template="plotly_white",
+        hovermode="x unified",
+        legend_title_text="Ticker",
+        margin=dict(l=40, r=20, t=40, b=40),
+        xaxis=dict(title_text="Date", rangeslider_visible=True),
+        colorway=["#2964b4", "#b24b7b"],  # your palette
+    ).to_plotly_json()
+
+def _page():
+    return html.Div(
+        id="hq-page",
+        className="page",
+        children=[
+            html.Section(id="hq-header", children=[
+                html.H2("Accumulated Investment Returns"),
+                html.P("Interactive chart to explore how your investments would have grown over time. See the value of $100 invested on November 1, 1999 (or any custom start date) and track its growth through your chosen end date.")
+            ]),
+            html.Section(
+                id="hq-body",
+                children=[
+                    html.Aside(id="hq-sidebar", children=[_controls()]),
+                    html.Section(
+                        id="hq-content",
+                        children=[
+                            dcc.Graph(id="hq-chart", config={"displayModeBar": "hover"}),
+                            dcc.Store(id="hq-px"),   # chart width in pixels, sets the point budget
+                            dcc.Store(id="hq-data"),   # downsampled index series, drawn clientside
+                            dcc.Store(id="hq-portfolio"),   # portfolio backtest, only in portfolio mode
+                            dcc.Store(id="hq-layout", data=_base_layout()),
+                        ],
+                    ),
+                ],
+            ),
+        ],
+    )
 
 def layout():
     if not session.get("user"):
         return dcc.Location(pathname="/login?next=/hundred", id="hq-redirect")
-    return _page
+    return _page()
 
-def _invest_100_over_range(prices: pd.DataFrame, tickers, start_date, end_date) -> pd.DataFrame:
+def _index_over_range(tickers, start_date, end_date):
     """
-    Rebase each ticker so the first available point *inside* the chosen
-    range equals $100, then compound forward.
-    Returns columns: date, symbol, val_100
+    $100 at each ticker's first available date overall, shown inside the chosen range.
+    Returns (dates, matrix) with one column per ticker.
     """
-    df = prices[prices["symbol"].isin(tickers)].copy()
-    # clip to selected window (if user picks a weekend, we start from first trading date >= start_date)
-    s = pd.to_datetime(start_date) if start_date else df["date"].min()
-    e = pd.to_datetime(end_date) if end_date else df["date"].max()
-    df = df[(df["date"] >= s) & (df["date"] <= e)].sort_values(["symbol", "date"])
-
-    # returns computed *within* the window
-    df["ret"] = df.groupby("symbol")["close"].pct_change()
-    df["ret"] = df["ret"].fillna(0.0)  # first point in range => 0% so it stays at 100
-    idx = (1.0 + df["ret"]).groupby(df["symbol"]).cumprod()
-    df["val_100"] = 100.0 * idx
-    return df[["date", "symbol", "val_100"]]
+    dates, mat = close_panel(tickers, start_date, end_date)
+    first = np.array([float(close_window(t)[1][0]) for t in tickers])
+    return dates, 100.0 * mat / first
 
-@callback(
+register_search("hq-tickers")
+
+register_width("hq-px", "hq-chart")
+
+# Series mode and log scale are pure presentation over the same prices, so the
+# server ships the index series once and assets/hundred.js draws the figure:
+# "invest" is the index rebased to each line's first in-range point.
+clientside_callback(
+    ClientsideFunction(namespace="hundred", function_name="figure"),
     Output("hq-chart", "figure"),
+    Input("hq-data", "data"),
+    Input("hq-series", "value"),
+    Input("hq-log", "value"),
+    Input("hq-portfolio", "data"),
+    State("hq-layout", "data"),
+)
+
+@callback(
+    Output("hq-data", "data"),
     Input("hq-tickers", "value"),
     Input("hq-dates", "start_date"),
     Input("hq-dates", "end_date"),
+    Input("hq-chart", "relayoutData"),
+    State("hq-px", "data"),
+)
+def update_series(tickers, start_date, end_date, relayout, width_px):
+    # Zoom/pan re-renders the visible range at full resolution; other relayout events are ignored
+    zoomed = ctx.triggered_id == "hq-chart"
+    if zoomed and not is_zoom_event(relayout):
+        return no_update
+    visible = visible_range(relayout) if zoomed else None
+
+    if not tickers:
+        return {"symbols": [], "series": []}
+
+    # same inputs + same data version -> same payload; serve it from the figure cache
+    width_px = budget_px(width_px)
+    visible = (day(visible[0]), day(visible[1])) if visible else None
+    key = ("hundred", tuple(tickers), day(start_date), day(end_date), visible, width_px, data_version(tickers))
+    return FIGURES.cached_or_message(key, lambda: _series(tickers, start_date, end_date, visible, width_px),
+                                     lambda msg: {"symbols": [], "series": [], "message": msg})
+
+
+def _series(tickers, start_date, end_date, visible, width_px):
+    """
+    Compact chart payload: per ticker, the downsampled index ($100 at first
+    available date) as integer days since 1970-01-01 plus values.
+    """
+    with phase("load"):
+        dates, mat = _index_over_range(tickers, start_date, end_date)
+    with phase("compute"):
+        days = np.asarray(dates).astype("datetime64[D]").astype(np.int64)
+        series = []
+        for j, t in enumerate(tickers):
+            # LTTB always keeps the first valid point, which is the client's "invest" base
+            idx = select(dates, mat[:, j], width_px, visible)
+            series.append({"d": days[idx].tolist(), "v": np.round(mat[idx, j], 4).tolist()})
+    return {
+        "symbols": list(tickers),
+        "series": series,
+        # keep the user's zoom while a zoom re-render swaps in finer data
+        "uirevision": f"{tickers}|{start_date}|{end_date}",
+    }
+
+
+@callback(
+    Output("hq-portfolio", "data"),
     Input("hq-series", "value"),
-    Input("hq-log", "value"),
+    Input("hq-tickers", "value"),
+    Input("hq-dates", "start_date"),
+    Input("hq-dates", "end_date"),
+    Input("hq-weights", "value"),
+    Input("hq-rebalance", "value"),
+    Input("hq-dca", "value"),
+    Input("hq-chart", "relayoutData"),
+    State("hq-px", "data"),
 )
-def update_chart(tickers, start_date, end_date, series_mode, log_value):
+def update_portfolio(mode, tickers, start_date, end_date, weights, rebalance, dca, relayout, width_px):
+    # the backtest is only computed while it is on screen; leaving the mode clears it
+    if mode != "portfolio":
+        return None if ctx.triggered_id == "hq-series" else no_update
+    zoomed = ctx.triggered_id == "hq-chart"
+    if zoomed and not is_zoom_event(relayout):
+        return no_update
+    visible = visible_range(relayout) if zoomed else None
     if not tickers:
-        return px.line(title="Select at least one ticker")
-
-    custom_colors = ["#2964b4", "#b24b7b"]  # your palette
-
-    if series_mode == "invest":
-        # Rebase within the selected range -> “accumulative” $100 chart
-        cum = _invest_100_over_range(PRICES, tickers, start_date, end_date)
-        fig = px.line(
-            cum,
-            x="date",
-            y="val_100",
-            color="symbol",
-            labels={"val_100": "Value of $100 (USD)", "date": "date", "symbol": "Ticker"},
-            color_discrete_sequence=custom_colors,
-        )
-    else:
-        # Legacy index ($100 at first available date overall)
-        df = NORM[NORM["symbol"].isin(tickers)].copy()
-        if start_date and end_date:
-            df = df[(df["date"] >= pd.to_datetime(start_date)) & (df["date"] <= pd.to_datetime(end_date))]
-        fig = px.line(
-            df,
-            x="date",
-            y="norm",
-            color="symbol",
-            labels={"norm": "Beginning Index from $100 (USD)", "date": "Date", "symbol": "Ticker"},
-            color_discrete_sequence=custom_colors,
-        )
-
-    fig.update_layout(
-        hovermode="x unified",
-        legend_title_text="Ticker",
-        template="plotly_white",
-        margin=dict(l=40, r=20, t=40, b=40),
-    )
-    fig.update_xaxes(rangeslider_visible=True)
+        return None
+
+    width_px = budget_px(width_px)
+    visible = (day(visible[0]), day(visible[1])) if visible else None
+    dca = max(0.0, float(dca or 0))
+    key = ("hundred-portfolio", tuple(tickers), day(start_date), day(end_date), (weights or "").strip().upper(),
+           rebalance, dca, visible, width_px, data_version(tickers))
+    return FIGURES.cached_or_message(key, lambda: _portfolio(tickers, start_date, end_date, weights, rebalance,
+                                                             dca, visible, width_px),
+                                     lambda msg: {"message": msg})
 
-    if "log" in (log_value or []):
-        fig.update_yaxes(type="log")
 
-    return fig
+def _portfolio(tickers, start_date, end_date, weights, rebalance, dca, visible, width_px):
+    """
+    $100 invested at range start across ``tickers`` (weights spec, rebalancing
+    and monthly contributions per utils.backtest), downsampled like the index.
+    """
+    with phase("load"):
+        dates, mat = close_panel(tickers, start_date, end_date)
+    with phase("compute"):
+        result = backtest(mat, parse_weights(weights, tickers), dates, rebalance=rebalance, contribution=dca)
+        value = result["value"]
+        idx = select(dates, value, width_px, visible)
+        days = np.asarray(dates).astype("datetime64[D]").astype(np.int64)
+    return {
+        "d": days[idx].tolist(),
+        "v": np.round(value[idx], 4).tolist(),
+        # cumulative capital; only drawn when there are contributions
+        "invested": np.round(result["invested"][idx], 2).tolist() if dca else None,
+        "uirevision": f"{tickers}|{start_date}|{end_date}",
+    }
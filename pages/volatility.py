@@ -1,118 +1,139 @@
 # pages/volatility.py
-from dash import html, dcc, register_page, callback, Input, Output
+from dash import html, dcc, register_page, callback, ctx, no_update, Input, Output, State
 from flask import session
 import plotly.express as px
 import pandas as pd
 
-from utils.data import get_prices, TICKERS_DEFAULT
+from utils.analytics import to_long
+from utils.downsample import budget_px, downsample_shared, is_zoom_event, register_width, visible_range
+from utils.figcache import FIGURES, data_version, day
+from utils.metrics import phase
+from utils.selector import register_search, symbol_dropdown
+from utils.volcube import vol_panel
+from utils.data import default_bounds, TICKERS_DEFAULT
 
 register_page(__name__, path="/volatility", name="Volatility")
 
-# pull close-only prices once (cached by your data utils)
-PRICES_ALL = get_prices(TICKERS_DEFAULT)
-
-# sensible default dates: last ~12 months within available data
-T_MIN = PRICES_ALL["date"].min()
-T_MAX = PRICES_ALL["date"].max()
-TODAY = pd.Timestamp.today().normalize()
-DEFAULT_END = min(TODAY, T_MAX)
-DEFAULT_START = max(T_MIN, DEFAULT_END - pd.Timedelta(days=365))
-
-controls = html.Div(id="vol-controls", children=[
-    html.Div(className="control", children=[
-        html.Label("Tickers", htmlFor="vol-tickers"),
-        dcc.Checklist(
-            id="vol-tickers",
-            value=TICKERS_DEFAULT,
-            options=[{"label": t, "value": t} for t in TICKERS_DEFAULT],
-            inline=True,
-        ),
-    ]),
-    html.Div(className="control", children=[
-        html.Label("Date Range", htmlFor="vol-dates"),
-        dcc.DatePickerRange(
-            id="vol-dates",
-            min_date_allowed=T_MIN,
-            max_date_allowed=T_MAX,
-            start_date=DEFAULT_START.date(),
-            end_date=DEFAULT_END.date(),
-            display_format="YYYY-MM-DD",
-        ),
-    ]),
-    html.Div(className="control", children=[
-        html.Label("Rolling Window (trading days)", htmlFor="vol-window"),
-        dcc.Slider(
-            id="vol-window",
-            min=10, max=120, step=5, value=30,
-            marks={10: "10", 30: "30", 60: "60", 90: "90", 120: "120"},
-            tooltip={"placement": "bottom", "always_visible": False},
-        ),
-    ]),
-])
-
-_page = html.Div(id="vol-page", children=[
-    html.Section(id="vol-header", children=[
-        html.H2("Volatility"),
-        html.P("Interactive chart to explore how your investments would face changing levels of risk over time. Experience how your investment is exposed to different levels of market uncertainty, and visualize how to balance growth against risk using rolling annualized volatility in an adjustable window."),
-    ]),
-    html.Section(id="vol-body", children=[
-        html.Aside(id="vol-sidebar", children=[controls]),
-        html.Section(id="vol-content", children=[
-            dcc.Graph(id="vol-chart", config={"displayModeBar": "hover"}, style={"height": "72vh"}),
+# the callback slices precomputed volatility (utils.volcube); the layout reads
+# date bounds from the store's metadata index instead of loading prices.
+
+def _controls():
+    # sensible default dates: last ~12 months within available data
+    t_min, t_max = default_bounds(TICKERS_DEFAULT)
+    today = pd.Timestamp.today().normalize()
+    default_end = min(today, t_max)
+    default_start = max(t_min, default_end - pd.Timedelta(days=365))
+    return html.Div(id="vol-controls", children=[
+        html.Div(className="control", children=[
+            html.Label("Tickers", htmlFor="vol-tickers"),
+            symbol_dropdown("vol-tickers", TICKERS_DEFAULT, multi=True),
+        ]),
+        html.Div(className="control", children=[
+            html.Label("Date Range", htmlFor="vol-dates"),
+            dcc.DatePickerRange(
+                id="vol-dates",
+                min_date_allowed=t_min,
+                max_date_allowed=t_max,
+                start_date=default_start.date(),
+                end_date=default_end.date(),
+                display_format="YYYY-MM-DD",
+            ),
+        ]),
+        html.Div(className="control", children=[
+            html.Label("Rolling Window (trading days)", htmlFor="vol-window"),
+            dcc.Slider(
+                id="vol-window",
+                min=10, max=120, step=5, value=30,
+                marks={10: "10", 30: "30", 60: "60", 90: "90", 120: "120"},
+                tooltip={"placement": "bottom", "always_visible": False},
+            ),
+        ]),
+    ])
+
+def _page():
+    return html.Div(id="vol-page", children=[
+        html.Section(id="vol-header", children=[
+            html.H2("Volatility"),
+            html.P("Interactive chart to explore how your investments would face changing levels of risk over time. Experience how your investment is exposed to different levels of market uncertainty, and visualize how to balance growth against risk using rolling annualized volatility in an adjustable window."),
+        ]),
+        html.Section(id="vol-body", children=[
+            html.Aside(id="vol-sidebar", children=[_controls()]),
+            html.Section(id="vol-content", children=[
+                dcc.Graph(id="vol-chart", config={"displayModeBar": "hover"}, style={"height": "72vh"}),
+                dcc.Store(id="vol-px"),   # chart width in pixels, sets the point budget
+            ]),
         ]),
-    ]),
-])
+    ])
 
 def layout():
     # gate access like your other pages
     if not session.get("user"):
         return dcc.Location(pathname="/login?next=/volatility", id="vol-redirect")
-    return _page
+    return _page()
 
 
+register_search("vol-tickers")
+
+register_width("vol-px", "vol-chart")
+
 @callback(
     Output("vol-chart", "figure"),
     Input("vol-tickers", "value"),
     Input("vol-dates", "start_date"),
     Input("vol-dates", "end_date"),
     Input("vol-window", "value"),
+    Input("vol-chart", "relayoutData"),
+    State("vol-px", "data"),
 )
-def update_vol_chart(tickers, start_date, end_date, window):
+def update_vol_chart(tickers, start_date, end_date, window, relayout, width_px):
+    # Zoom/pan re-renders the visible range at full resolution; other relayout events are ignored
+    zoomed = ctx.triggered_id == "vol-chart"
+    if zoomed and not is_zoom_event(relayout):
+        return no_update
+    visible = visible_range(relayout) if zoomed else None
+
     if not tickers:
         # empty chart prompt
         return px.area(title="Select at least one ticker")
 
-    # filter by tickers + date window
-    df = PRICES_ALL[PRICES_ALL["symbol"].isin(tickers)].copy()
-    if start_date and end_date:
-        s, e = pd.to_datetime(start_date), pd.to_datetime(end_date)
-        df = df[(df["date"] >= s) & (df["date"] <= e)]
-
-    # compute rolling annualized volatility
-    df = df.sort_values(["symbol", "date"])
-    df["ret"] = df.groupby("symbol")["close"].pct_change()
-    ann = 252 ** 0.5
-    df["roll_vol"] = (
-        df.groupby("symbol")["ret"]
-          .rolling(window, min_periods=window)
-          .std()
-          .reset_index(level=0, drop=True) * ann
-    )
-    vol = df.dropna(subset=["roll_vol"])[["date", "symbol", "roll_vol"]]
-    
-    custom_colors = ["#2964b4", "#b24b7b"] # changes the colors of the graph
-    fig = px.area(
-        vol, x="date", y="roll_vol", color="symbol",
-        labels={"roll_vol": "Annualized Volatility", "date": "Date", "symbol": "Ticker"},
-        template="plotly_white", color_discrete_sequence=custom_colors,
-    )
-    fig.update_layout(
-        title="Rolling Volatility",
-        hovermode="x unified",
-        legend=dict(orientation="h", yanchor="bottom", y=1.02, x=0),
-        margin=dict(l=40, r=20, t=85, b=40),
-    )
-    fig.update_yaxes(tickformat=".0%")
-    fig.update_xaxes(rangeslider_visible=True)
+    # same inputs + same data version -> same figure; serve it from the figure cache
+    width_px = budget_px(width_px)
+    visible = (day(visible[0]), day(visible[1])) if visible else None
+    key = ("volatility", tuple(tickers), day(start_date), day(end_date), window,
+           visible, width_px, data_version(tickers))
+    return FIGURES.cached_or_message(key, lambda: _figure(tickers, start_date, end_date, window, visible, width_px),
+                                     lambda msg: px.area(title=msg))
+
+
+def _figure(tickers, start_date, end_date, window, visible, width_px):
+    # slice the precomputed vol cube: rolling annualized volatility for every
+    # slider window is built once per data refresh, so a drag is just a lookup
+    with phase("load"):
+        if start_date and end_date:
+            dates, mat = vol_panel(tickers, window, start_date, end_date)
+        else:
+            dates, mat = vol_panel(tickers, window)
+    with phase("compute"):
+        # stacked areas need one shared set of dates, so every ticker keeps the same points
+        dates, mat = downsample_shared(dates, mat, width_px, visible)
+        vol = to_long(dates, tickers, mat, "roll_vol")
+
+    with phase("figure"):
+        custom_colors = ["#2964b4", "#b24b7b"] # changes the colors of the graph
+        fig = px.area(
+            vol, x="date", y="roll_vol", color="symbol",
+            labels={"roll_vol": "Annualized Volatility", "date": "Date", "symbol": "Ticker"},
+            template="plotly_white", color_discrete_sequence=custom_colors,
+        )
+        fig.update_layout(
+            title="Rolling Volatility",
+            hovermode="x unified",
+            legend=dict(orientation="h", yanchor="bottom", y=1.02, x=0),
+            margin=dict(l=40, r=20, t=85, b=40),
+            # keep the user's zoom while a zoom re-render swaps in finer data
+            uirevision=f"{tickers}|{start_date}|{end_date}|{window}",
+        )
+        fig.update_yaxes(tickformat=".0%")
+        fig.update_xaxes(rangeslider_visible=True)
 
     return fig
@@ -0,0 +1,178 @@
+"""
+Benchmark the data, analytics and figure paths on synthetic universes.
+
+    python scripts/bench.py                                  # 2, 50 and 1,000 symbols
+    python scripts/bench.py --universes 2,50 --out bench.json
+    python scripts/bench.py --baseline bench.json            # exit 1 on regressions
+
+Each universe is written to a throwaway store (in a temp directory), so the
+real data_cache is never touched. Results are JSON: one record per
+(universe, case) with the best of --repeat wall times.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+from fixtures import END, synthetic_ohlcv, temp_store
+
+CHART_TICKERS = 10      # symbols drawn per chart; a page never plots the whole universe
+PORTFOLIO_TICKERS = 500   # largest portfolio the /hundred backtest is expected to keep interactive
+CORRELATION_TICKERS = 200   # largest matrix the /correlation page is expected to keep responsive
+WIDTH_PX = 1200
+
+
+def invest_100_over_range(tickers, start_date, end_date):
+    """
+    The /hundred "invest" series computed server-side: each ticker rebased to
+    $100 at its first close inside the range. The page draws it clientside
+    from the index series (assets/hundred.js); this is the reference path.
+    """
+    from utils.analytics import rebase
+    from utils.arena import close_panel
+    dates, mat = close_panel(tickers, start_date, end_date)
+    return dates, rebase(mat)
+
+
+def timed(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+def run_universe(n: int, days: int, repeat: int) -> list:
+    """All cases for one universe size, in a fresh store under the current directory (./data_cache)."""
+    import plotly.io as pio
+    from utils import arena, correlation, data as D, features, volcube
+    from utils.figcache import FIGURES
+    import pages.activity as activity
+    import pages.correlation as corr_page
+    import pages.hundred_question as hundred
+    import pages.volatility as volatility
+
+    rng = np.random.default_rng(n)
+    symbols = [f"S{i:04d}" for i in range(n)]
+    for s in symbols:
+        D.STORE.write(s, synthetic_ohlcv(days, rng))
+    shown = symbols[:CHART_TICKERS]
+    end = pd.Timestamp(END)
+    start = end - pd.Timedelta(days=365 * 5)
+
+    results = []
+
+    def case(name, fn, repeat=repeat, per=None, payload=None):
+        seconds = timed(fn, repeat)
+        record = {"universe": n, "case": name, "seconds": round(seconds, 6)}
+        if per:
+            record["per_item_us"] = round(seconds / per * 1e6, 2)
+        if payload is not None:
+            record["bytes"] = payload
+        results.append(record)
+        print(f"{n:>6} {name:<34}{seconds:>10.4f}s", file=sys.stderr)
+
+    # --- data loading
+    case("read_cache", lambda: [D._read_cache(s) for s in symbols], per=n)
+    case("get_prices[cold]", lambda: (D.clear_price_cache(), D.get_prices(symbols)), per=n)
+    case("get_prices[warm]", lambda: D.get_prices(symbols), per=n)
+    case("build_arena", arena.build_arena, repeat=1)
+    arena._ARENA, arena._CHECKED = None, 0.0   # attach the build for this universe
+    case("get_panel[close]", lambda: D.get_panel(symbols, start, end), per=n)
+    case("get_panel[ohlc,inner,ffill]", lambda: D.get_panel(symbols, start, end, ("open", "high", "low", "close"),
+                                                             how="inner", ffill=True), per=n)
+
+    # --- analytics kernels
+    case("invest_100_over_range", lambda: invest_100_over_range(symbols, start, end), per=n)
+    case("precompute_all[force]", lambda: features.precompute_all(symbols, force=True), repeat=1, per=n)
+    case("vol_panel[cube,w=30]", lambda: volcube.vol_panel(symbols, 30, start, end), per=n)
+    case("vol_panel[direct,w=33]", lambda: volcube.vol_panel(symbols, 33, start, end), per=n)
+    book = symbols[:PORTFOLIO_TICKERS]
+    case("portfolio[M,dca]", lambda: hundred._portfolio(book, start, end, "", "M", 100.0, None, WIDTH_PX),
+         per=len(book))
+    matrix = symbols[:CORRELATION_TICKERS]
+    case("corr_matrix", lambda: corr_page._heatmap(matrix, start, end, "corr"), per=len(matrix))
+    case("rolling_mean_corr[cold,w=60]", lambda: (correlation._ROLLING.clear(),
+         correlation.rolling_mean_corr(matrix, 60, start, end, points=WIDTH_PX // 4)), per=len(matrix))
+
+    # --- page figures: build (figure cache bypassed) and serialize
+    builds = [
+        ("hundred", lambda: hundred._series(shown, start, end, None, WIDTH_PX)),
+        ("volatility", lambda: volatility._figure(shown, start, end, 30, None, WIDTH_PX)),
+        ("activity[D]", lambda: activity._figure(shown[0], end - pd.Timedelta(days=60), end, "D")),
+        ("activity[W]", lambda: activity._figure(shown[0], start, end, "W")),
+    ]
+    for page, build in builds:
+        FIGURES.clear()
+        fig = build()
+        text = json.dumps(fig) if isinstance(fig, dict) else pio.to_json(fig, validate=False)
+        case(f"figure[{page}]", build)
+        case(f"serialize[{page}]", (lambda f=fig: json.dumps(f)) if isinstance(fig, dict)
+             else (lambda f=fig: pio.to_json(f, validate=False)), payload=len(text))
+    return results
+
+
+def compare(results: list, baseline_path: str, tolerance: float) -> list:
+    """Cases slower than the baseline by more than ``tolerance`` (fraction)."""
+    with open(baseline_path) as f:
+        base = {(r["universe"], r["case"]): r["seconds"] for r in json.load(f)["results"]}
+    slower = []
+    for r in results:
+        old = base.get((r["universe"], r["case"]))
+        # ignore sub-millisecond cases: timer noise dominates
+        if old and r["seconds"] > 1e-3 and r["seconds"] > old * (1 + tolerance):
+            slower.append({**r, "baseline": old, "ratio": round(r["seconds"] / old, 2)})
+    return slower
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--universes", default="2,50,1000", help="comma-separated universe sizes")
+    p.add_argument("--days", type=int, default=6500, help="trading days per symbol")
+    p.add_argument("--repeat", type=int, default=3)
+    p.add_argument("--out", help="write the JSON report here (default: stdout)")
+    p.add_argument("--baseline", help="earlier report to compare against")
+    p.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs the baseline")
+    args = p.parse_args(argv)
+    out = os.path.abspath(args.out) if args.out else None
+    baseline = os.path.abspath(args.baseline) if args.baseline else None
+
+    # each universe gets its own throwaway store
+    results = []
+    with temp_store("bench-"):
+        with contextlib.redirect_stdout(sys.stderr):   # keep stdout clean for the JSON report
+            import app  # noqa: F401  (registers the pages so their callbacks can be imported)
+        from utils import data as D
+        for n in (int(x) for x in args.universes.split(",")):
+            with temp_store(f"bench-u{n}-"):
+                results += run_universe(n, args.days, args.repeat)
+
+    report = {
+        "meta": {"python": platform.python_version(), "pandas": pd.__version__, "numpy": np.__version__,
+                 "backend": D.STORE.backend_name, "days": args.days, "repeat": args.repeat,
+                 "created": time.strftime("%Y-%m-%dT%H:%M:%S")},
+        "results": results,
+    }
+    if baseline:
+        report["regressions"] = compare(results, baseline, args.tolerance)
+
+    text = json.dumps(report, indent=1)
+    if out:
+        with open(out, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+    return 1 if report.get("regressions") else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Check utils.analytics against the pandas code it replaced and time both.
+
+    python scripts/bench_analytics.py                  # 500 symbols x 6,500 days
+    python scripts/bench_analytics.py --symbols 50 --days 2000
+
+Exits non-zero if any kernel disagrees with its pandas reference.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fixtures import synthetic_closes
+from utils import analytics as A
+
+
+# --- the per-page pandas implementations the engine replaces
+
+def legacy_normalize_to_100(prices):
+    df = prices.sort_values(["symbol", "date"]).copy()
+    df["norm"] = df.groupby("symbol")["close"].transform(lambda s: 100 * s / s.iloc[0])
+    return df[["date", "symbol", "norm"]]
+
+
+def legacy_invest_100(prices, tickers, s, e):
+    df = prices[prices["symbol"].isin(tickers)].copy()
+    df = df[(df["date"] >= s) & (df["date"] <= e)].sort_values(["symbol", "date"])
+    df["ret"] = df.groupby("symbol")["close"].pct_change().fillna(0.0)
+    df["val_100"] = 100.0 * (1.0 + df["ret"]).groupby(df["symbol"]).cumprod()
+    return df[["date", "symbol", "val_100"]]
+
+
+def legacy_rolling_vol(prices, window):
+    df = prices.sort_values(["symbol", "date"]).copy()
+    df["ret"] = df.groupby("symbol")["close"].pct_change()
+    df["roll_vol"] = (df.groupby("symbol")["ret"].rolling(window, min_periods=window).std()
+                      .reset_index(level=0, drop=True) * 252 ** 0.5)
+    return df.dropna(subset=["roll_vol"])[["date", "symbol", "roll_vol"]]
+
+
+def legacy_bars(daily, bars, freq, s, e):
+    """The bars whose period (pandas Period, weeks Monday..Sunday) holds a trading day of s..e."""
+    period = {"W": "W-SUN", "M": "M", "Q": "Q"}[freq]
+    days = daily[(daily["date"] >= s) & (daily["date"] <= e)]
+    return bars[bars["date"].dt.to_period(period).isin(set(days["date"].dt.to_period(period)))]
+
+
+def timed(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t)
+    return best
+
+
+def same(a: pd.DataFrame, b: pd.DataFrame, col: str, rtol: float) -> bool:
+    a = a.astype({"symbol": str}).sort_values(["symbol", "date"]).reset_index(drop=True)
+    b = b.astype({"symbol": str}).sort_values(["symbol", "date"]).reset_index(drop=True)
+    return (len(a) == len(b) and (a["date"].values == b["date"].values).all()
+            and np.allclose(a[col].values, b[col].values, rtol=rtol, atol=1e-12))
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--symbols", type=int, default=500)
+    p.add_argument("--days", type=int, default=6500)
+    p.add_argument("--window", type=int, default=30)
+    args = p.parse_args(argv)
+
+    prices = synthetic_closes(args.symbols, args.days)
+    dates, symbols, mat = A.to_wide(prices, "close")
+    s, e = pd.Timestamp(dates[len(dates) // 3]), pd.Timestamp(dates[-1])
+    lo, hi = np.searchsorted(dates, s.to_datetime64()), len(dates)
+
+    # (name, value column, pandas reference, engine kernel on the matrix, kernel -> long frame)
+    cases = [
+        ("normalize_to_100", "norm",
+         lambda: legacy_normalize_to_100(prices),
+         lambda: A.rebase(mat),
+         lambda m: A.to_long(dates, symbols, m, "norm")),
+        ("invest_100_over_range", "val_100",
+         lambda: legacy_invest_100(prices, symbols, s, e),
+         lambda: A.rebase(mat[lo:hi]),
+         lambda m: A.to_long(dates[lo:hi], symbols, m, "val_100")),
+        (f"rolling_vol[{args.window}]", "roll_vol",
+         lambda: legacy_rolling_vol(prices, args.window),
+         lambda: A.rolling_vol(mat, args.window),
+         lambda m: A.to_long(dates, symbols, m, "roll_vol")),
+    ]
+
+    ok = True
+    print(f"{args.symbols} symbols x {args.days} days")
+    print(f"{'kernel':<26}{'pandas s':>10}{'kernel s':>10}{'+long s':>10}{'speedup':>9}  equal")
+    for name, col, legacy, kernel, long in cases:
+        equal = same(legacy(), long(kernel()), col, rtol=1e-7)
+        t_old, t_kernel, t_long = timed(legacy), timed(kernel), timed(lambda: long(kernel()))
+        ok &= equal
+        print(f"{name:<26}{t_old:>10.4f}{t_kernel:>10.4f}{t_long:>10.4f}{t_old / t_kernel:>8.1f}x  {equal}")
+
+    probe = symbols[len(symbols) // 2]
+    # aggregated candles for ranges starting on every calendar day of a quarter, weekends and
+    # holidays included (a few sessions are dropped): no bar from before the range
+    daily = prices[prices["symbol"] == probe].drop(index=prices.index[::17], errors="ignore")
+    daily = daily.reset_index(drop=True).assign(open=1.0, high=1.0, low=1.0)
+    starts = pd.date_range(s - pd.Timedelta(days=45), s + pd.Timedelta(days=45))
+    for freq in ("W", "M", "Q"):
+        bars = A.resample_ohlc(daily, freq)
+        bd, dd = bars["date"].to_numpy(), daily["date"].to_numpy()
+        equal = all(bars.iloc[slice(*A.bar_bounds(bd, dd, freq, t, e))].equals(legacy_bars(daily, bars, freq, t, e))
+                    for t in starts)
+        t_old = timed(lambda: legacy_bars(daily, bars, freq, s, e))
+        t_new = timed(lambda: A.bar_bounds(bd, dd, freq, s, e))
+        ok &= equal
+        print(f"{f'bar_bounds[{freq}]':<26}{t_old:>10.4f}{t_new:>10.4f}{'':>10}{t_old / t_new:>8.1f}x  {equal}")
+    wide = A.to_wide(prices, "close")
+    pivot = prices.pivot(index="date", columns="symbol", values="close").sort_index()
+    equal = list(pivot.columns) == wide[1] and np.array_equal(pivot.to_numpy(), wide[2], equal_nan=True)
+    t_old = timed(lambda: prices.pivot(index="date", columns="symbol", values="close").sort_index())
+    t_new = timed(lambda: A.to_wide(prices, "close"))
+    ok &= equal
+    print(f"{'to_wide':<26}{t_old:>10.4f}{t_new:>10.4f}{'':>10}{t_old / t_new:>8.1f}x  {equal}")
+
+    # kernels with no single legacy counterpart: report engine time only
+    for name, fn in [("rolling_mean[50]", lambda: A.rolling_mean(mat, 50)),
+                     ("drawdown", lambda: A.drawdown(mat)),
+                     ("returns", lambda: A.returns(mat))]:
+        print(f"{name:<26}{'':>10}{timed(fn):>10.4f}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
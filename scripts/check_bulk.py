@@ -0,0 +1,162 @@
+"""
+Check the bulk price loader (utils.bulk) against a local Alpha Vantage stub.
+
+    python scripts/check_bulk.py
+    python scripts/check_bulk.py --rate 300 --symbols 12
+
+Serves TIME_SERIES_DAILY CSVs from a threaded HTTP server on localhost and
+points utils.data at it, with a throwaway store. Checks that:
+  - every API call takes a token, including the second (full) call a refresh
+    makes when the compact tail would leave a gap, for prime() and prime_async();
+  - throttled calls (the JSON "Note" body) are retried with backoff and succeed;
+  - a run that gives up records the failure in the checkpoint, and a resumed
+    run fetches only what is not done yet.
+Exits non-zero if any check fails.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fixtures import temp_store
+
+THROTTLE_BODY = b'{"Note": "Thank you for using Alpha Vantage! Our standard API rate limit is ..."}'
+
+
+class Stub(BaseHTTPRequestHandler):
+    """TIME_SERIES_DAILY over 300 sessions ending today; behaviour per symbol set on the server."""
+
+    def do_GET(self):
+        q = parse_qs(urlparse(self.path).query)
+        symbol, size = q["symbol"][0], q["outputsize"][0]
+        server = self.server
+        with server.lock:
+            server.calls.append((time.monotonic(), symbol, size))
+            server.seen[symbol] = n = server.seen.get(symbol, 0) + 1
+        if n <= server.throttle.get(symbol, 0):
+            body = THROTTLE_BODY
+        else:
+            dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=300)
+            if size == "compact":
+                # a short tail for GAP* symbols: it starts after their stored history ends
+                dates = dates[-(20 if symbol.startswith("GAP") else 100):]
+            close = np.linspace(10.0, 20.0, len(dates))
+            frame = pd.DataFrame({"timestamp": dates[::-1].strftime("%Y-%m-%d"), "open": close[::-1],
+                                  "high": close[::-1], "low": close[::-1], "close": close[::-1],
+                                  "volume": 1000})
+            body = frame.to_csv(index=False).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/csv")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def serve():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Stub)
+    server.lock, server.calls, server.seen, server.throttle = threading.Lock(), [], {}, {}
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def within_rate(times, rate_per_min: float, burst: int, slack: float = 0.05) -> bool:
+    """
+    True if no interval holds more calls than a token bucket allows (burst +
+    rate * length). Times are taken when requests reach the stub, so each
+    interval gets ``slack`` seconds for thread scheduling between token and request.
+    """
+    times, rate = sorted(times), rate_per_min / 60.0
+    return all(j - i + 1 <= burst + rate * (times[j] - times[i] + slack)
+               for i in range(len(times)) for j in range(i + 1, len(times)))
+
+
+def report(name: str, ok: bool, detail: str = "") -> bool:
+    print(f"{name:<40}{'ok' if ok else 'FAILED'}  {detail}")
+    return ok
+
+
+def seed_gap(D, symbol: str) -> None:
+    """Stored history ending 60 days ago: inside the compact window, before the short GAP tail."""
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize() - pd.Timedelta(days=60), periods=50)
+    D.STORE.write(symbol, pd.DataFrame({"date": dates, "open": 1.0, "high": 1.0, "low": 1.0,
+                                        "close": 1.0, "volume": 1}))
+
+
+def run_checks(server, rate: float, n: int, workers: int) -> bool:
+    from utils import bulk as B
+    from utils import data as D
+
+    quiet = lambda *a: None
+    ok = True
+    delays = [B.backoff(a) for a in range(1, 8) for _ in range(50)]
+    ok &= report("backoff jittered and capped", 0 <= min(delays) and max(delays) <= 60
+                 and len(set(delays)) > 1, f"max {max(delays):.1f}s")
+    # keep the retry sleeps short for the runs below
+    real = B.backoff
+    B.backoff = lambda attempt: real(attempt, base=0.05)
+
+    for name, runner in [("prime", lambda syms, **kw: B.prime(syms, workers=workers, **kw)),
+                         ("prime_async", lambda syms, **kw: asyncio.run(B.prime_async(syms, concurrency=workers, **kw)))]:
+        symbols = [f"{name.upper()}{i}" for i in range(n)] + [f"GAP{name.upper()}{i}" for i in range(2)]
+        for s in symbols[-2:]:
+            seed_gap(D, s)
+        server.throttle.update({symbols[0]: 2})
+        server.calls.clear()
+        state = runner(symbols, rate_per_min=rate, log=quiet)
+        calls = list(server.calls)
+        gap_calls = [c for c in calls if c[1].startswith("GAP")]
+        burst = min(workers, max(1, int(rate)))
+        ok &= report(f"{name}: all symbols done", state.done == set(symbols) and not state.failed)
+        ok &= report(f"{name}: gap refresh makes 2 calls", len(gap_calls) == 4,
+                     f"{[c[2] for c in gap_calls]}")
+        ok &= report(f"{name}: throttled symbol retried", sum(c[1] == symbols[0] for c in calls) == 3)
+        ok &= report(f"{name}: every call within the rate", within_rate([c[0] for c in calls], rate, burst),
+                     f"{len(calls)} calls in {calls[-1][0] - calls[0][0]:.2f}s")
+
+    # checkpoint/resume: the throttled symbol gives up, a second run fetches only it
+    path = os.path.abspath("checkpoint.json")
+    symbols = [f"RES{i}" for i in range(4)]
+    server.throttle.update({"RES0": 1})
+    server.calls.clear()
+    first = B.prime(symbols, rate_per_min=rate, workers=workers, checkpoint=path, max_tries=1, log=quiet)
+    ok &= report("checkpoint records the failure", set(first.failed) == {"RES0"} and len(first.done) == 3)
+    server.calls.clear()
+    second = B.prime(symbols, rate_per_min=rate, workers=workers, checkpoint=path, log=quiet)
+    ok &= report("resume fetches only what is left", [c[1] for c in server.calls] == ["RES0"]
+                 and second.done == set(symbols) and not second.failed,
+                 f"{[c[1] for c in server.calls]}")
+    return ok
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--rate", type=float, default=600, help="requests per minute for the bucket")
+    p.add_argument("--symbols", type=int, default=8)
+    p.add_argument("--workers", type=int, default=4)
+    args = p.parse_args(argv)
+
+    from utils import data as D
+
+    server = serve()
+    D.BASE, D.API_KEY = f"http://127.0.0.1:{server.server_port}/query", "stub"
+    try:
+        with temp_store("bulkcheck-"):
+            ok = run_checks(server, args.rate, args.symbols, args.workers)
+    finally:
+        server.shutdown()
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
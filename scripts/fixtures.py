@@ -0,0 +1,61 @@
+"""
+Synthetic prices and throwaway stores shared by the bench and check scripts.
+
+    from fixtures import synthetic_closes, synthetic_ohlcv, temp_store
+
+Not a script itself: the others import it from this directory.
+"""
+import contextlib
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+END = "2025-09-09"
+
+
+def _walk(rng, shape) -> np.ndarray:
+    """Random-walk closes starting near 50 (about 7% drift and 32% volatility a year)."""
+    return 50 * np.exp(np.cumsum(rng.normal(0.0003, 0.02, shape), axis=0))
+
+
+def synthetic_ohlcv(n_days: int, rng, end: str = END) -> pd.DataFrame:
+    """One symbol's daily OHLCV on the business days up to ``end``, as STORE.write takes it."""
+    dates = pd.bdate_range(end=end, periods=n_days)
+    close = _walk(rng, n_days)
+    spread = np.abs(rng.normal(0, 0.01, n_days)) * close
+    return pd.DataFrame({"date": dates, "open": close + rng.normal(0, 0.5, n_days) * spread,
+                         "high": close + spread, "low": close - spread, "close": close,
+                         "volume": rng.integers(1e5, 1e7, n_days)})
+
+
+def synthetic_closes(n_symbols: int, n_days: int, seed: int = 0, start: str = "2000-01-03") -> pd.DataFrame:
+    """Long date, symbol, close frame, symbol-major, all symbols on one business-day calendar."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(start, periods=n_days)
+    closes = _walk(rng, (n_days, n_symbols))
+    symbols = [f"S{i:04d}" for i in range(n_symbols)]
+    return pd.DataFrame({"date": np.tile(dates.values, n_symbols),
+                         "symbol": np.repeat(symbols, n_days),
+                         "close": closes.T.reshape(-1)})
+
+
+@contextlib.contextmanager
+def temp_store(prefix: str = "store-"):
+    """
+    Run the block in a fresh temp directory with an empty ./data_cache: the
+    store, arena and caches all live under that relative path, so the real
+    data_cache is never touched. Restores the working directory and removes
+    the temp directory on exit.
+    """
+    cwd, base = os.getcwd(), tempfile.mkdtemp(prefix=prefix)
+    try:
+        os.chdir(base)
+        from utils.data import CACHE_DIR   # a first import creates ./data_cache: do it in here
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        yield base
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(base, ignore_errors=True)
@@ -0,0 +1,75 @@
+"""
+Check the memory saved by compact frames (COMPACT_FRAMES: float32 prices, categorical symbols).
+
+    python scripts/memory_footprint.py                       # 100 symbols x 2,500 days
+    python scripts/memory_footprint.py --symbols 200 --max-ratio 0.4
+
+Fills the per-process price cache from a throwaway store in the default
+layout (float64 + a string per row) and in the compact one, and compares the
+cached bytes and the prices the pages read back. Exits non-zero if the
+compact cache is larger than --max-ratio of the default or a value disagrees.
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from fixtures import synthetic_ohlcv, temp_store
+
+
+def report(name: str, base: int, small: int, max_ratio: float) -> bool:
+    ratio = small / base
+    ok = ratio <= max_ratio
+    print(f"{name:<28}{base / 2**20:>12.1f}{small / 2**20:>12.1f}{ratio:>8.2f}  {'ok' if ok else 'TOO BIG'}")
+    return ok
+
+
+def store_case(n: int, days: int, max_ratio: float) -> bool:
+    """The price cache on a real (temporary) store, default vs compact."""
+    from utils import data as D
+
+    rng = np.random.default_rng(n)
+    symbols = [f"S{i:04d}" for i in range(n)]
+    for s in symbols:
+        D.STORE.write(s, synthetic_ohlcv(days, rng))
+
+    D.clear_price_cache()
+    default = [D.get_ohlc(s) for s in symbols]
+    default_cache = D.cache_stats()["bytes"]
+    D.COMPACT_FRAMES = True   # per-symbol frames are built at cache-fill time
+    try:
+        D.clear_price_cache()
+        small = [D.get_ohlc(s) for s in symbols]
+        ok = report("price cache (per symbol)", default_cache, D.cache_stats()["bytes"], max_ratio)
+    finally:
+        D.COMPACT_FRAMES = False
+        D.clear_price_cache()
+
+    # the default layout rounds to the 4 dp Alpha Vantage quotes; compact keeps the stored float32
+    cols = ["open", "high", "low", "close"]
+    same = all(np.array_equal(a["date"].to_numpy(), b["date"].to_numpy())
+               and (a["symbol"].astype(str).to_numpy() == b["symbol"].astype(str).to_numpy()).all()
+               and np.allclose(a[cols].to_numpy(), b[cols].to_numpy(np.float64), rtol=0, atol=1e-4)
+               for a, b in zip(default, small))
+    print(f"{'ohlc values match':<28}{same}")
+    return ok and same
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--symbols", type=int, default=100, help="symbols written to the temporary store")
+    p.add_argument("--days", type=int, default=2500)
+    p.add_argument("--max-ratio", type=float, default=0.5, help="largest allowed compact/default byte ratio")
+    args = p.parse_args(argv)
+
+    print(f"{args.symbols} symbols x {args.days} days")
+    print(f"{'frame':<28}{'default MB':>12}{'compact MB':>12}{'ratio':>8}")
+    with temp_store("memcheck-"):
+        ok = store_case(args.symbols, args.days, args.max_ratio)
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,45 @@
+"""
+Build the derived series (normalized index, returns, chart indicators, vol cubes)
+for every stored symbol on a process pool.
+
+    python scripts/precompute.py                    # stale symbols, all cores
+    python scripts/precompute.py AAPL MSFT --force
+    python scripts/precompute.py --workers 4
+    python scripts/precompute.py --arena           # also (re)build the shared price arena
+
+gunicorn starts this script (with --arena) in the background once its workers
+are up, and the refresh scheduler runs the same stages after each refresh; run
+it by hand e.g. after bulk-loading prices or changing a series' definition.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.arena import ensure_arena
+from utils.features import PRECOMPUTE_WORKERS, precompute_all
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("symbols", nargs="*", help="symbols to build (default: every stored symbol)")
+    p.add_argument("--workers", type=int, default=PRECOMPUTE_WORKERS, help="processes (default: all cores)")
+    p.add_argument("--force", action="store_true", help="rebuild even if the saved series are current")
+    p.add_argument("--arena", action="store_true", help="first build the price arena if it is missing or outdated")
+    args = p.parse_args(argv)
+
+    t = time.perf_counter()
+    if args.arena:
+        arena = ensure_arena()
+        print(f"price arena {arena.version}: {len(arena.symbols)} symbols, {len(arena.close)} rows "
+              f"({time.perf_counter() - t:.1f}s)")
+    built = precompute_all([s.upper() for s in args.symbols] or None, workers=args.workers,
+                           force=args.force, log=print)
+    print(f"Done: {len(built)} symbols rebuilt in {time.perf_counter() - t:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,74 +1,70 @@
-import os
-import time
-import pandas as pd
-import requests
+"""
+Prime data_cache from Alpha Vantage.
 
-API_KEY = os.environ.get("ALPHAVANTAGE_API_KEY", "").strip()
-if not API_KEY:
-    raise SystemExit("Set ALPHAVANTAGE_API_KEY in your environment before running.")
+    python scripts/prime_cache.py                       # default tickers
+    python scripts/prime_cache.py -f scripts/tickers.txt --tier premium-75 --workers 8
+    python scripts/prime_cache.py AAPL MSFT --full
+    python scripts/prime_cache.py -f data_cache/universe.csv --tier premium-150 --async --workers 32
 
-BASE = "https://www.alphavantage.co/query"
-TICKERS = ["AAPL", "MSFT"]
-CACHE_DIR = "data_cache"
-os.makedirs(CACHE_DIR, exist_ok=True)
+Progress is checkpointed; re-running after an interruption skips finished
+symbols (use --restart to start over).
+"""
+import argparse
+import asyncio
+import os
+import sys
 
-def fetch_csv(url, expect_cols, max_tries=6, sleep_sec=15):
-    """Request CSV; retry if throttled or schema is wrong."""
-    for i in range(1, max_tries + 1):
-        r = requests.get(url, timeout=30)
-        text = r.text.strip()
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if not os.environ.get("ALPHAVANTAGE_API_KEY", "").strip():
+    raise SystemExit("Set ALPHAVANTAGE_API_KEY in your environment before running.")
 
-        # Alpha Vantage throttling returns JSON with a "Note" or "Information"
-        if text.startswith("{") or "Note" in text or "Information" in text:
-            print(f"[try {i}] throttled; waiting {sleep_sec}s")
-            time.sleep(sleep_sec)
-            continue
+from utils.arena import ensure_arena
+from utils.bulk import TIERS, prime, prime_async, read_tickers
+from utils.data import CACHE_DIR, STORE, TICKERS_DEFAULT
+from utils.features import precompute_all
 
-        df = pd.read_csv(pd.compat.StringIO(text)) if hasattr(pd.compat, "StringIO") else pd.read_csv(pd.io.common.StringIO(text))
+CHECKPOINT = os.path.join(CACHE_DIR, ".prime_checkpoint.json")
 
-        # Some responses return 'timestamp' instead of 'date' – normalize here
-        if "timestamp" in df.columns and "date" not in df.columns:
-            df = df.rename(columns={"timestamp": "date"})
 
-        if all(col in df.columns for col in expect_cols):
-            return df
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Fetch daily OHLCV for many tickers into data_cache.")
+    p.add_argument("tickers", nargs="*", help="symbols to fetch (default: TICKERS_DEFAULT)")
+    p.add_argument("-f", "--file", help="ticker list file, one symbol per line")
+    p.add_argument("--tier", choices=sorted(TIERS), default="free", help="API plan (sets the rate limit)")
+    p.add_argument("--rate", type=float, help="requests per minute (overrides --tier)")
+    p.add_argument("--workers", type=int, default=4)
+    p.add_argument("--async", dest="use_async", action="store_true",
+                   help="drive the fetches from an asyncio loop (--workers = requests in flight)")
+    p.add_argument("--tries", type=int, default=5)
+    p.add_argument("--full", action="store_true", help="always download the full history")
+    p.add_argument("--checkpoint", default=CHECKPOINT)
+    p.add_argument("--restart", action="store_true", help="ignore an existing checkpoint")
+    args = p.parse_args(argv)
 
-        print(f"[try {i}] unexpected columns {list(df.columns)}; waiting {sleep_sec}s")
-        time.sleep(sleep_sec)
+    symbols = read_tickers(args.file) if args.file else [t.upper() for t in args.tickers] or TICKERS_DEFAULT
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
 
-    raise RuntimeError("Could not fetch a valid CSV after retries.")
+    STORE.migrate_all()
+    rate = args.rate or TIERS[args.tier]
+    if args.use_async:
+        state = asyncio.run(prime_async(symbols, rate_per_min=rate, concurrency=args.workers,
+                                        checkpoint=args.checkpoint, max_tries=args.tries, full=args.full))
+    else:
+        state = prime(symbols, rate_per_min=rate, workers=args.workers,
+                      checkpoint=args.checkpoint, max_tries=args.tries, full=args.full)
 
-def fetch_daily(symbol: str):
-    url = (
-        f"{BASE}?function=TIME_SERIES_DAILY&symbol={symbol}"
-        f"&outputsize=full&datatype=csv&apikey={API_KEY}"
-    )
-    df = fetch_csv(url, expect_cols=["date", "close"])
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-    df["close"] = pd.to_numeric(df["close"], errors="coerce")
-    df["symbol"] = symbol
-    df = df.dropna(subset=["date", "close"]).sort_values("date")
-    out = os.path.join(CACHE_DIR, f"{symbol}_daily.csv")
-    df[["date", "close", "symbol"]].to_csv(out, index=False)
-    print("wrote", out)
+    print(f"Derived series rebuilt: {len(precompute_all(sorted(state.done)))} symbols")
+    print(f"Price arena: {ensure_arena().version}")
+    print(f"Cache ready: {len(state.done)} done, {len(state.failed)} failed")
+    if state.failed:
+        print("Failed:", ", ".join(sorted(state.failed)))
+        return 1
+    if os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)   # complete run; next one starts fresh
+    return 0
 
-def fetch_daily_ohlc(symbol: str):
-    url = (
-        f"{BASE}?function=TIME_SERIES_DAILY&symbol={symbol}"
-        f"&outputsize=full&datatype=csv&apikey={API_KEY}"
-    )
-    df = fetch_csv(url, expect_cols=["date", "open", "high", "low", "close"])
-    for c in ["open", "high", "low", "close"]:
-        df[c] = pd.to_numeric(df[c], errors="coerce")
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-    df["symbol"] = symbol
-    df = df.dropna(subset=["date", "open", "high", "low", "close"]).sort_values("date")
-    out = os.path.join(CACHE_DIR, f"{symbol}_daily_ohlc.csv")
-    df[["date", "open", "high", "low", "close", "symbol"]].to_csv(out, index=False)
-    print("wrote", out)
 
 if __name__ == "__main__":
-    for t in TICKERS:
-        fetch_daily(t)
-        fetch_daily_ohlc(t)
-    print("Cache ready:", os.listdir(CACHE_DIR))
+    sys.exit(main())
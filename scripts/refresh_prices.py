@@ -0,0 +1,51 @@
+"""
+Keep data_cache current: refresh stale symbols after each market close.
+
+    python scripts/refresh_prices.py                 # poll forever (sidecar)
+    python scripts/refresh_prices.py --once          # one round, e.g. from cron
+    python scripts/refresh_prices.py --tier premium-75 --workers 4
+
+gunicorn starts this as a sidecar when REFRESH_SCHEDULER=1 (see gunicorn.conf.py).
+"""
+import argparse
+import os
+import signal
+import sys
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+if not os.environ.get("ALPHAVANTAGE_API_KEY", "").strip():
+    raise SystemExit("Set ALPHAVANTAGE_API_KEY in your environment before running.")
+
+from utils.bulk import TIERS
+from utils.scheduler import REFRESH_POLL_S, REFRESH_RATE, RefreshScheduler
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Refresh stale symbols in data_cache after market close.")
+    p.add_argument("symbols", nargs="*", help="symbols to keep fresh (default: every stored symbol)")
+    p.add_argument("--once", action="store_true", help="run a single round and exit")
+    p.add_argument("--tier", choices=sorted(TIERS), help="API plan (sets the rate limit)")
+    p.add_argument("--rate", type=float, help="requests per minute (overrides --tier)")
+    p.add_argument("--workers", type=int, default=2)
+    p.add_argument("--poll", type=float, default=REFRESH_POLL_S, help="seconds between staleness checks")
+    args = p.parse_args(argv)
+
+    rate = args.rate or (TIERS[args.tier] if args.tier else REFRESH_RATE)
+    scheduler = RefreshScheduler([s.upper() for s in args.symbols] or None, rate_per_min=rate,
+                                 workers=args.workers, poll_s=args.poll)
+    if args.once:
+        refreshed = scheduler.run_once()
+        print(f"Refreshed {len(refreshed)} symbols")
+        return 0
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    scheduler.run_forever(stop)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,56 @@
+"""
+Measure how long a worker takes to import the app and fail if it is over budget.
+
+    python scripts/startup_check.py              # budget from STARTUP_BUDGET_S (default 0.5s)
+    python scripts/startup_check.py --budget 0.3 --runs 5
+
+Third-party imports (dash, pandas, plotly, ...) are timed separately: the budget
+covers the app's own startup work (page registration, layout, DB init), which
+must not read prices or touch the network.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = r"""
+import json, time
+t0 = time.perf_counter()
+import dash, flask, pandas, plotly.express, plotly.graph_objects, sqlalchemy, requests
+t1 = time.perf_counter()
+import utils.store
+reads = []
+_read = utils.store.PriceStore.read
+utils.store.PriceStore.read = lambda self, symbol, columns=None: reads.append(symbol) or _read(self, symbol, columns)
+import app
+t2 = time.perf_counter()
+print(json.dumps({"framework_s": t1 - t0, "app_s": t2 - t1, "price_reads": len(reads)}))
+"""
+
+
+def measure() -> dict:
+    out = subprocess.run([sys.executable, "-c", PROBE], cwd=ROOT, capture_output=True,
+                         text=True, check=True).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--budget", type=float, default=float(os.getenv("STARTUP_BUDGET_S", "0.5")))
+    p.add_argument("--runs", type=int, default=3)
+    args = p.parse_args(argv)
+
+    runs = [measure() for _ in range(args.runs)]
+    best = min(runs, key=lambda r: r["app_s"])
+    report = {"budget_s": args.budget, "app_s": round(best["app_s"], 4),
+              "framework_s": round(best["framework_s"], 4), "price_reads": best["price_reads"],
+              "ok": best["app_s"] <= args.budget and best["price_reads"] == 0}
+    print(json.dumps(report))
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,320 @@
+"""
+Vectorized return/risk kernels on wide (date x symbol) float matrices.
+
+Every function takes a 2-D array with one column per symbol (NaN where a
+symbol has no quote) and processes all columns in one pass; no per-symbol
+Python loops or groupby lambdas. Rolling windows count rows of the shared
+date axis, which matches per-symbol pandas rolling when the symbols trade on
+the same calendar.
+"""
+import numpy as np
+import pandas as pd
+
+ANN_FACTOR = 252 ** 0.5
+
+
+def _2d(mat) -> np.ndarray:
+    mat = np.asarray(mat, dtype=np.float64)
+    return mat[:, None] if mat.ndim == 1 else mat
+
+
+def first_valid(mat) -> np.ndarray:
+    """Row index of the first non-NaN value in each column (len(mat) if none)."""
+    mat = _2d(mat)
+    valid = ~np.isnan(mat)
+    return np.where(valid.any(axis=0), valid.argmax(axis=0), len(mat))
+
+
+def rebase(mat, base: float = 100.0) -> np.ndarray:
+    """Scale each column so its first valid value equals ``base`` (the $100 index)."""
+    mat = _2d(mat)
+    first = first_valid(mat)
+    cols = np.arange(mat.shape[1])
+    start = np.full(mat.shape[1], np.nan)
+    has = first < len(mat)
+    start[has] = mat[first[has], cols[has]]
+    return base * mat / start
+
+
+def ffill(mat) -> np.ndarray:
+    """Forward-fill NaNs down each column."""
+    mat = _2d(mat)
+    idx = np.where(~np.isnan(mat), np.arange(len(mat))[:, None], 0)
+    np.maximum.accumulate(idx, axis=0, out=idx)
+    # leading NaNs point at row 0, which is NaN itself, so they stay NaN
+    return mat[idx, np.arange(mat.shape[1])]
+
+
+def returns(mat) -> np.ndarray:
+    """Simple returns against each column's previous valid value; NaN on the first row and on gaps."""
+    mat = _2d(mat)
+    prev = np.full_like(mat, np.nan)
+    if len(mat) > 1:
+        prev[1:] = ffill(mat)[:-1]
+    return mat / prev - 1.0
+
+
+def _shifted(mat):
+    """(values shifted by each column's first value with NaN -> 0, valid mask, shift)."""
+    valid = ~np.isnan(mat)
+    # the shift keeps the running sums of squares small, limiting cancellation
+    first = first_valid(mat)
+    has = first < len(mat)
+    ref = np.zeros(mat.shape[1])
+    ref[has] = mat[first[has], np.arange(mat.shape[1])[has]]
+    return np.where(valid, mat - ref, 0.0), valid, ref
+
+
+def _window_sums(mat, window: int):
+    """Rolling sum of values, squares and valid counts over ``window`` rows (NaN counted as missing)."""
+    x, valid, ref = _shifted(mat)
+
+    def rolled(a):
+        c = np.cumsum(a, axis=0)
+        out = c.copy()
+        out[window:] -= c[:-window]
+        return out
+
+    return rolled(x), rolled(x * x), rolled(valid.astype(np.int64)), ref
+
+
+def rolling_mean(mat, window: int, min_periods: int = None) -> np.ndarray:
+    mat = _2d(mat)
+    min_periods = window if min_periods is None else min_periods
+    s1, _, n, ref = _window_sums(mat, window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        out = s1 / n + ref
+    out[n < max(min_periods, 1)] = np.nan
+    return out
+
+
+def rolling_std(mat, window: int, min_periods: int = None, ddof: int = 1) -> np.ndarray:
+    mat = _2d(mat)
+    min_periods = window if min_periods is None else min_periods
+    s1, s2, n, _ = _window_sums(mat, window)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        var = (s2 - s1 * s1 / n) / (n - ddof)
+    out = np.sqrt(np.clip(var, 0.0, None))
+    out[(n < max(min_periods, 1)) | (n - ddof <= 0)] = np.nan
+    return out
+
+
+def rolling_std_windows(mat, windows, ddof: int = 1) -> np.ndarray:
+    """rolling_std for several window lengths sharing one set of cumulative sums -> (len(windows), T, N)."""
+    mat = _2d(mat)
+    x, valid, _ = _shifted(mat)
+    c1, c2, cn = np.cumsum(x, axis=0), np.cumsum(x * x, axis=0), np.cumsum(valid, axis=0)
+
+    out = np.empty((len(windows),) + mat.shape)
+    for k, w in enumerate(windows):
+        s1, s2, n = c1.copy(), c2.copy(), cn.copy()
+        s1[w:] -= c1[:-w]
+        s2[w:] -= c2[:-w]
+        n[w:] -= cn[:-w]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            var = (s2 - s1 * s1 / n) / (n - ddof)
+        out[k] = np.sqrt(np.clip(var, 0.0, None))
+        out[k][(n < w) | (n - ddof <= 0)] = np.nan
+    return out
+
+
+def rolling_vol(prices, window: int, annualize: bool = True) -> np.ndarray:
+    """Rolling (annualized) volatility of daily returns; NaN until ``window`` returns exist."""
+    vol = rolling_std(returns(prices), window, min_periods=window)
+    return vol * ANN_FACTOR if annualize else vol
+
+
+def ema(mat, span: int) -> np.ndarray:
+    """
+    Exponential moving average with alpha = 2 / (span + 1), seeded with each
+    column's first value (pandas ewm(span=span, adjust=False)); gaps carry the
+    last value. The recursion runs as cumulative sums over blocks of rows
+    whose decay factors stay in float range, not as a loop over rows.
+    """
+    mat = ffill(mat)
+    n, k = mat.shape
+    out = np.full_like(mat, np.nan)
+    if n == 0:
+        return out
+    alpha = 2.0 / (span + 1.0)
+    decay = 1.0 - alpha
+    first = first_valid(mat)
+    has = first < n
+    seed = np.zeros(k)
+    seed[has] = mat[first[has], np.arange(k)[has]]
+    # rows before a column's first value hold the seed, so the EMA starts exactly there
+    x = np.where(np.isnan(mat), seed, mat)
+    if decay == 0.0:
+        out = x.copy()
+    else:
+        block = max(1, int(50.0 / -np.log(decay)))   # decay ** -block stays below e**50
+        carry = seed
+        for lo in range(0, n, block):
+            hi = min(n, lo + block)
+            j = np.arange(hi - lo, dtype=np.float64)[:, None]
+            acc = np.cumsum(x[lo:hi] * decay ** -j, axis=0)
+            out[lo:hi] = decay ** (j + 1) * carry + alpha * decay ** j * acc
+            carry = out[hi - 1]
+    out[np.arange(n)[:, None] < first] = np.nan
+    return out
+
+
+def bollinger(mat, window: int = 20, k: float = 2.0):
+    """(middle, upper, lower) Bollinger bands: rolling mean +- k population standard deviations."""
+    mid = rolling_mean(mat, window)
+    band = k * rolling_std(mat, window, ddof=0)
+    return mid, mid + band, mid - band
+
+
+def drawdown(mat) -> np.ndarray:
+    """Fractional drop from the running peak (0 at new highs, negative below)."""
+    mat = _2d(mat)
+    peak = np.fmax.accumulate(mat, axis=0)
+    return mat / peak - 1.0
+
+
+# --- OHLC bars
+
+FREQS = {"D": "day", "W": "week", "M": "month", "Q": "quarter"}
+
+
+def _bucket_keys(dates, freq: str) -> np.ndarray:
+    d = np.asarray(dates).astype("datetime64[D]")
+    if freq == "W":
+        # 1970-01-01 was a Thursday; shift so weeks run Monday..Sunday
+        return (d.astype(np.int64) + 3) // 7
+    months = d.astype("datetime64[M]").astype(np.int64)
+    return months if freq == "M" else months // 3
+
+
+def resample_ohlc(df: pd.DataFrame, freq: str) -> pd.DataFrame:
+    """
+    Aggregate a date-sorted OHLC frame into weekly/monthly/quarterly bars:
+    first open, max high, min low, last close (volume summed if present).
+    Each bar is dated at its first trading day so it lines up with daily data.
+    """
+    if freq == "D" or df.empty:
+        return df
+    keys = _bucket_keys(df["date"].to_numpy(), freq)
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    ends = np.r_[starts[1:], len(df)] - 1
+    out = {"date": df["date"].to_numpy()[starts],
+           "open": df["open"].to_numpy()[starts],
+           "high": np.maximum.reduceat(df["high"].to_numpy(), starts),
+           "low": np.minimum.reduceat(df["low"].to_numpy(), starts),
+           "close": df["close"].to_numpy()[ends]}
+    if "volume" in df.columns:
+        out["volume"] = np.add.reduceat(df["volume"].to_numpy(), starts)
+    bars = pd.DataFrame(out)
+    if "symbol" in df.columns:
+        bars["symbol"] = df["symbol"].iloc[0]
+    return bars
+
+
+def auto_freq(start, end, max_bars: int = 300) -> str:
+    """Finest bar size that keeps a start..end range under ~``max_bars`` candles."""
+    days = (pd.Timestamp(end) - pd.Timestamp(start)).days
+    for freq, per_bar in (("D", 7 / 5), ("W", 7), ("M", 30.4)):
+        if days / per_bar <= max_bars:
+            return freq
+    return "Q"
+
+
+# --- conversions between the long frames the pages use and wide matrices
+
+def window_bounds(dates, start=None, end=None):
+    """(lo, hi) so that dates[lo:hi] covers start <= date <= end; binary search on sorted dates."""
+    lo = 0 if start is None else int(np.searchsorted(dates, np.datetime64(pd.Timestamp(start), "D"), "left"))
+    hi = len(dates) if end is None else int(np.searchsorted(dates, np.datetime64(pd.Timestamp(end), "D"), "right"))
+    return lo, hi
+
+
+def bar_bounds(bar_dates, dates, freq: str, start=None, end=None):
+    """
+    (lo, hi) so that bar_dates[lo:hi] are the resample_ohlc bars of ``dates``
+    holding a trading day between start and end. Bars are compared by period,
+    so a start on a weekend or holiday never pulls in the bar before it.
+    """
+    if freq == "D":
+        return window_bounds(bar_dates, start, end)
+    lo, hi = window_bounds(dates, start, end)
+    if lo >= hi:
+        return 0, 0
+    keys = _bucket_keys(bar_dates, freq)
+    first, last = _bucket_keys(np.asarray(dates)[[lo, hi - 1]], freq)
+    return int(np.searchsorted(keys, first, "left")), int(np.searchsorted(keys, last, "right"))
+
+
+def symbol_ranges(long: pd.DataFrame, column: str = "symbol"):
+    """
+    {symbol: (lo, hi)} row ranges of a symbol-major long frame (each symbol's
+    rows contiguous, as get_prices and to_long build them), or None if some
+    symbol's rows are split. One vectorized pass; lookups are then O(1).
+    """
+    col = long[column]
+    codes = col.cat.codes.to_numpy() if isinstance(col.dtype, pd.CategoricalDtype) else pd.factorize(col)[0]
+    if not len(codes):
+        return {}
+    starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+    if len(np.unique(codes[starts])) != len(starts):
+        return None
+    ends = np.r_[starts[1:], len(codes)]
+    names = col.to_numpy()[starts]
+    return {str(s): (int(lo), int(hi)) for s, lo, hi in zip(names, starts, ends)}
+
+
+def sorted_blocks(long: pd.DataFrame):
+    """symbol_ranges() if every symbol's block is also sorted by strictly increasing date, else None."""
+    ranges = symbol_ranges(long)
+    if not ranges:
+        return ranges
+    step = np.diff(long["date"].to_numpy()) > np.timedelta64(0)
+    starts = np.asarray([lo for lo, _ in ranges.values()], dtype=np.int64)
+    step[starts[1:] - 1] = True   # block boundaries may go back in time
+    return ranges if step.all() else None
+
+
+def align(parts):
+    """
+    [(dates, values), ...] per symbol -> (dates, matrix) on the union of the
+    dates, one column per part, NaN where a part has no row.
+    """
+    if not parts:
+        return np.empty(0, dtype="datetime64[D]"), np.empty((0, 0))
+    dates = parts[0][0]
+    if any(len(d) != len(dates) or not np.array_equal(d, dates) for d, _ in parts[1:]):
+        dates = np.unique(np.concatenate([d for d, _ in parts]))
+    mat = np.full((len(dates), len(parts)), np.nan)
+    for j, (d, v) in enumerate(parts):
+        rows = np.searchsorted(dates, d) if len(d) != len(dates) else slice(None)
+        mat[rows, j] = v
+    return np.asarray(dates), mat
+
+
+def to_wide(long: pd.DataFrame, value: str = "close"):
+    """Long (date, symbol, value) -> (dates, symbols, matrix), symbols sorted."""
+    ranges = sorted_blocks(long)
+    if ranges is not None:
+        # symbol-major with each block date-sorted: slice the blocks instead of pivoting
+        dates, values = long["date"].to_numpy(), long[value].to_numpy(np.float64)
+        symbols = sorted(ranges)
+        out_dates, mat = align([(dates[lo:hi], values[lo:hi]) for lo, hi in (ranges[s] for s in symbols)])
+        return out_dates, symbols, mat
+    wide = long.pivot(index="date", columns="symbol", values=value).sort_index()
+    return wide.index.values, list(wide.columns), wide.to_numpy(dtype=np.float64)
+
+
+def to_long(dates, symbols, mat, value: str, dropna: bool = True) -> pd.DataFrame:
+    """
+    (dates, symbols, matrix) -> long frame with columns date, symbol, ``value``
+    in symbol-major order. ``symbol`` is categorical (categories in the given
+    order), which is far cheaper than repeating strings on every row.
+    """
+    mat = _2d(mat)
+    n = len(dates)
+    df = pd.DataFrame({
+        "date": np.tile(np.asarray(dates), len(symbols)),
+        "symbol": pd.Categorical.from_codes(np.repeat(np.arange(len(symbols)), n), categories=list(symbols)),
+        value: mat.T.reshape(-1),
+    })
+    return df.dropna(subset=[value]).reset_index(drop=True) if dropna else df
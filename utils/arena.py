@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import numpy as np
+
+from utils.analytics import window_bounds
+from utils.data import CACHE_DIR, STORE, DataError, _symbol_lock, fetch_daily, get_panel
+
+# Close prices for every stored symbol, laid out back to back in two flat files
+# (float32 closes + datetime64[D] dates) and memory-mapped read-only. All
+# gunicorn workers map the same pages from the OS page cache, so the prices are
+# held once per machine instead of once per worker.
+ARENA_DIR = os.path.join(CACHE_DIR, "arena")
+ARENA_CHECK_S = float(os.getenv("ARENA_CHECK_S", "30"))
+
+
+class Arena:
+    """Read-only view over an arena build: symbol -> (offset, length) into flat arrays."""
+
+    def __init__(self, root: str, manifest: dict):
+        self.root = root
+        self.version = manifest["version"]
+        self.index = {s: (v[0], v[1]) for s, v in manifest["symbols"].items()}
+        # store mtime each symbol was packed from; symbols written since are read per symbol
+        self.mtimes = {s: v[2] if len(v) > 2 else None for s, v in manifest["symbols"].items()}
+        self.stale = set()
+        rows = manifest["rows"]
+        if rows:
+            self.close = np.memmap(os.path.join(root, manifest["close"]), dtype=np.float32, mode="r", shape=(rows,))
+            self.dates = np.memmap(os.path.join(root, manifest["dates"]), dtype="datetime64[D]", mode="r", shape=(rows,))
+        else:
+            self.close = np.empty(0, dtype=np.float32)
+            self.dates = np.empty(0, dtype="datetime64[D]")
+
+    def __contains__(self, symbol: str) -> bool:
+        """True if ``symbol`` is packed and its stored prices have not changed since."""
+        return symbol in self.index and symbol not in self.stale
+
+    @property
+    def symbols(self) -> list:
+        return sorted(self.index)
+
+    def series(self, symbol: str):
+        """(dates, close) views for the whole history of ``symbol``; no copies."""
+        off, n = self.index[symbol]
+        return self.dates[off:off + n], self.close[off:off + n]
+
+    def window(self, symbol: str, start=None, end=None):
+        """(dates, close) views restricted to start <= date <= end (binary search on sorted dates)."""
+        dates, close = self.series(symbol)
+        lo, hi = window_bounds(dates, start, end)
+        return dates[lo:hi], close[lo:hi]
+
+
+def _stored_symbols() -> list:
+    return [s for s in STORE.symbols() if STORE.exists(s)]
+
+
+def _version(symbols) -> str:
+    stamp = "|".join(f"{s}:{STORE.mtime(s)}" for s in symbols)
+    return hashlib.sha1(stamp.encode()).hexdigest()[:16]
+
+
+def _manifest_path(root: str) -> str:
+    return os.path.join(root, "arena.json")
+
+
+def build_arena(root: str = ARENA_DIR) -> Arena:
+    """
+    Pack every stored symbol into a new arena version and point the manifest at it.
+    Builds are serialized across processes; each one removes only its own temp
+    files and the files of the build its manifest replaced.
+    """
+    os.makedirs(root, exist_ok=True)
+    with _symbol_lock("_arena"):
+        return _build(root)
+
+
+def _build(root: str) -> Arena:
+    try:
+        with open(_manifest_path(root)) as f:
+            previous = json.load(f)
+        replaced = {previous.get("close"), previous.get("dates")}
+    except (FileNotFoundError, ValueError):
+        replaced = set()
+
+    symbols = _stored_symbols()
+    # stamps read before the prices: a write racing the build leaves that symbol stale
+    mtimes = {s: STORE.mtime(s) for s in symbols}
+    frames = {s: STORE.read(s, columns=["close"]) for s in symbols}
+    version = _version(symbols)
+
+    index, offset = {}, 0
+    for s, df in frames.items():
+        index[s] = [offset, len(df), mtimes[s]]
+        offset += len(df)
+
+    close_name, dates_name = f"close-{version}.f32", f"dates-{version}.d64"
+    tmp = f".{os.getpid()}.tmp"
+    mine = [os.path.join(root, name + tmp) for name in (close_name, dates_name, "arena.json")]
+    try:
+        if offset:
+            close = np.concatenate([df["close"].to_numpy(np.float32) for df in frames.values()])
+            dates = np.concatenate([df.index.values.astype("datetime64[D]") for df in frames.values()])
+            close.tofile(mine[0])
+            dates.tofile(mine[1])
+            os.replace(mine[0], os.path.join(root, close_name))
+            os.replace(mine[1], os.path.join(root, dates_name))
+
+        manifest = {"version": version, "rows": offset, "symbols": index,
+                    "close": close_name, "dates": dates_name, "built": time.time()}
+        with open(mine[2], "w") as f:
+            json.dump(manifest, f)
+        os.replace(mine[2], _manifest_path(root))
+    finally:
+        for path in mine:
+            if os.path.exists(path):
+                os.remove(path)
+
+    # the replaced build can go; workers that still map it keep their pages until they re-attach
+    for name in replaced - {None, close_name, dates_name}:
+        try:
+            os.remove(os.path.join(root, name))
+        except FileNotFoundError:
+            pass
+    return Arena(root, manifest)
+
+
+def attach(root: str = ARENA_DIR):
+    """Map the current arena build, or None if there is none."""
+    try:
+        with open(_manifest_path(root)) as f:
+            manifest = json.load(f)
+        return Arena(root, manifest)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def ensure_arena(root: str = ARENA_DIR) -> Arena:
+    """The current arena, rebuilt first if it is missing or older than the store (startup, prime, scheduler)."""
+    arena = attach(root)
+    if arena is None or arena.version != _version(_stored_symbols()):
+        arena = build_arena(root)
+    return arena
+
+
+_ARENA = None
+_CHECKED = 0.0
+_SEEN = None       # store data version when _ARENA was last validated
+_LOCK = threading.Lock()
+
+
+def get_arena():
+    """
+    This process's arena, or None if none has been built; re-attached when the
+    store changes, checked every ARENA_CHECK_S. Requests never build it (that
+    reads every stored symbol): symbols written since the last build are marked
+    stale and read per symbol until the scheduler, prime or startup rebuilds it.
+    """
+    global _ARENA, _CHECKED, _SEEN
+    with _LOCK:
+        if time.monotonic() - _CHECKED < ARENA_CHECK_S:
+            return _ARENA
+        seen = STORE.version()
+        if _ARENA is not None and seen == _SEEN:
+            # no store write since the last check: skip stat-ing every symbol
+            _CHECKED = time.monotonic()
+            return _ARENA
+        arena = attach()
+        if arena is not None and _ARENA is not None and arena.version == _ARENA.version:
+            arena = _ARENA   # same build: keep the existing mappings
+        if arena is not None:
+            arena.stale = {s for s, m in arena.mtimes.items() if STORE.mtime(s) != m}
+        _ARENA, _CHECKED, _SEEN = arena, time.monotonic(), seen
+        return _ARENA
+
+
+def close_window(symbol: str, start=None, end=None):
+    """(dates, close) for ``symbol`` between start and end; reads (or fetches) symbols the arena lacks."""
+    arena = get_arena()
+    if arena is not None and symbol in arena:
+        return arena.window(symbol, start, end)
+    df = fetch_daily(symbol)
+    if df.empty:
+        raise DataError(f"No data for {symbol}.")
+    dates = df["date"].to_numpy().astype("datetime64[D]")
+    close = df["close"].to_numpy(np.float32)
+    lo, hi = window_bounds(dates, start, end)
+    return dates[lo:hi], close[lo:hi]
+
+
+def close_panel(symbols, start=None, end=None):
+    """
+    (dates, matrix) of float64 closes for ``symbols`` between start and end,
+    one column per symbol on the union of their trading dates (NaN where a
+    symbol has no quote).
+    """
+    dates, panel = get_panel(symbols, start, end)
+    return dates, panel["close"]
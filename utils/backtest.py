@@ -0,0 +1,101 @@
+"""
+Portfolio backtests on wide (date x symbol) close matrices.
+
+Holdings only change on event days (rebalances and contributions), so the
+value series is built one holding period at a time as a single
+(rows x N) @ (N,) product over the price matrix. The loop runs over periods
+(about 12 a year), never over symbols, so 500-name portfolios stay
+interactive.
+"""
+import numpy as np
+
+from utils.analytics import _2d, _bucket_keys, ffill
+
+REBALANCE = {"none": "Buy and hold", "M": "Monthly", "Q": "Quarterly"}
+
+
+def event_rows(dates, freq: str) -> np.ndarray:
+    """Row of the first trading day of each week/month/quarter (``freq`` W/M/Q) in ``dates``."""
+    keys = _bucket_keys(dates, freq)
+    return np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.empty(0, dtype=np.int64)
+
+
+def parse_weights(text: str, symbols) -> np.ndarray:
+    """
+    "AAPL 60, MSFT 40" (or "AAPL:60") -> weights aligned to ``symbols``;
+    unlisted symbols get 0, a blank spec means equal weight.
+    """
+    w = np.zeros(len(symbols))
+    pos = {s: i for i, s in enumerate(symbols)}
+    for item in (text or "").replace(";", ",").split(","):
+        parts = item.replace(":", " ").replace("=", " ").split()
+        if len(parts) != 2 or parts[0].upper() not in pos:
+            continue
+        try:
+            w[pos[parts[0].upper()]] = max(0.0, float(parts[1].rstrip("%")))
+        except ValueError:
+            continue
+    return w if w.sum() > 0 else np.ones(len(symbols))
+
+
+def backtest(prices, weights=None, dates=None, rebalance: str = "none",
+             initial: float = 100.0, contribution: float = 0.0, contribution_freq: str = "M") -> dict:
+    """
+    Value of a weighted portfolio over the rows of ``prices`` (dates x symbols,
+    NaN where a symbol has no quote).
+
+    ``initial`` is invested at the first row with any weighted price. With
+    ``rebalance`` "M"/"Q", holdings are reset to the target weights on the
+    first trading day of each month/quarter; with ``contribution`` > 0, that
+    amount is added every ``contribution_freq`` period (dollar-cost averaging)
+    and bought at the target weights. Symbols without a quote yet are left out
+    and their weight spread over the rest until a rebalance can include them.
+    ``dates`` is required for rebalancing and contributions.
+
+    Returns {"value": (T,), "invested": (T,) cumulative capital, "events": rows}.
+    """
+    prices = _2d(prices)
+    n_rows, n_cols = prices.shape
+    w = np.ones(n_cols) if weights is None else np.asarray(weights, dtype=np.float64)
+    w = w / w.sum()
+    # holdings are valued at the last known close through gaps; not-yet-listed rows stay 0
+    held = ffill(prices)
+    valued = np.nan_to_num(held)
+
+    value = np.full(n_rows, np.nan)
+    invested = np.zeros(n_rows)
+    tradable = (~np.isnan(held)) & (w > 0)
+    live = np.flatnonzero(tradable.any(axis=1))
+    if not len(live):
+        return {"value": value, "invested": invested, "events": np.empty(0, dtype=np.int64)}
+    start = live[0]
+
+    rebal = set(event_rows(dates, rebalance).tolist()) if rebalance in ("W", "M", "Q") else set()
+    contrib = set(event_rows(dates, contribution_freq).tolist()) if contribution > 0 else set()
+    events = np.array(sorted({start} | {r for r in rebal | contrib if r > start}), dtype=np.int64)
+
+    shares = np.zeros(n_cols)
+    cash, capital = 0.0, 0.0
+    for k, r in enumerate(events):
+        end = events[k + 1] if k + 1 < len(events) else n_rows
+        p, ok = valued[r], tradable[r]
+        target = np.where(ok, w, 0.0)
+        target = target / target.sum() if target.sum() > 0 else target
+        if r == start:
+            add = initial
+            shares, cash = np.zeros(n_cols), initial
+        else:
+            add = contribution if r in contrib else 0.0
+            cash += add
+        capital += add
+
+        if r == start or r in rebal:
+            total = shares @ p + cash
+            shares = np.divide(target * total, p, out=np.zeros(n_cols), where=ok)
+        elif add:
+            shares = shares + np.divide(target * cash, p, out=np.zeros(n_cols), where=ok)
+        cash = 0.0 if target.sum() > 0 else cash   # nothing tradable yet: keep it as cash
+
+        value[r:end] = valued[r:end] @ shares + cash
+        invested[r:end] = capital
+    return {"value": value, "invested": invested, "events": events}
@@ -0,0 +1,174 @@
+import asyncio
+import functools
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from utils.data import DataError, refresh_symbol
+
+# Alpha Vantage request limits per minute by plan.
+TIERS = {"free": 5, "premium-75": 75, "premium-150": 150, "premium-300": 300,
+         "premium-600": 600, "premium-1200": 1200}
+
+
+class TokenBucket:
+    """Thread-safe token bucket: ``rate_per_min`` tokens/minute, bursts up to ``burst``."""
+
+    def __init__(self, rate_per_min: float, burst: int = 1):
+        self.rate = rate_per_min / 60.0
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _take(self) -> float:
+        """Take a token if one is available (returns 0), else return the seconds until one is."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self) -> None:
+        while (wait := self._take()) > 0:
+            time.sleep(wait)
+
+    async def acquire_async(self) -> None:
+        while (wait := self._take()) > 0:
+            await asyncio.sleep(wait)
+
+
+class _Prepaid:
+    """``pace`` hook whose first call was paid for up front (asynchronously); later ones take a token."""
+
+    def __init__(self, bucket: TokenBucket):
+        self.bucket, self.paid = bucket, True
+
+    def __call__(self) -> None:
+        if self.paid:
+            self.paid = False
+        else:
+            self.bucket.acquire()
+
+
+def backoff(attempt: int, base: float = 2.0, cap: float = 60.0) -> float:
+    """Full-jitter exponential backoff delay for retry number ``attempt`` (1-based)."""
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+def read_tickers(path: str) -> list:
+    """One symbol per line (extra CSV columns ignored); blank lines and # comments skipped."""
+    symbols = []
+    with open(path) as f:
+        for line in f:
+            sym = line.split("#")[0].split(",")[0].strip().upper()
+            if sym and sym != "SYMBOL" and sym not in symbols:
+                symbols.append(sym)
+    return symbols
+
+
+class Checkpoint:
+    """JSON record of finished/failed symbols so an interrupted run can resume."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.done, self.failed = set(), {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            self.done = set(state.get("done", []))
+            self.failed = state.get("failed", {})
+
+    def mark(self, symbol: str, error: str = None) -> None:
+        with self._lock:
+            if error is None:
+                self.done.add(symbol)
+                self.failed.pop(symbol, None)
+            else:
+                self.failed[symbol] = error
+            if self.path:
+                tmp = f"{self.path}.tmp"
+                with open(tmp, "w") as f:
+                    json.dump({"done": sorted(self.done), "failed": self.failed}, f, indent=1)
+                os.replace(tmp, self.path)
+
+
+def prime(symbols, rate_per_min: float = TIERS["free"], workers: int = 4,
+          checkpoint: str = None, max_tries: int = 5, full: bool = False,
+          fetch=refresh_symbol, log=print) -> Checkpoint:
+    """
+    Refresh ``symbols`` with a bounded worker pool. Every API call takes a token
+    from a shared bucket (``fetch`` calls its ``pace`` hook before each one), so
+    throughput is set by the plan's quota rather than by sleeps; throttled or
+    failed calls are retried with jittered backoff.
+    """
+    state = Checkpoint(checkpoint)
+    todo = [s for s in symbols if s not in state.done]
+    bucket = TokenBucket(rate_per_min, burst=min(workers, max(1, int(rate_per_min))))
+    log(f"{len(symbols) - len(todo)} already done, {len(todo)} to fetch at {rate_per_min}/min")
+
+    def run(symbol):
+        for attempt in range(1, max_tries + 1):
+            try:
+                df = fetch(symbol, full=full, pace=bucket.acquire)
+                return symbol, len(df), None
+            except (DataError, OSError) as e:
+                if attempt == max_tries:
+                    return symbol, 0, str(e)[:240]
+                delay = backoff(attempt)
+                log(f"[{symbol} try {attempt}] {str(e)[:80]}; retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for fut in as_completed([pool.submit(run, s) for s in todo]):
+            symbol, rows, error = fut.result()
+            state.mark(symbol, error)
+            log(f"{symbol}: {'FAILED ' + error if error else f'{rows} rows'}")
+    return state
+
+
+async def prime_async(symbols, rate_per_min: float = TIERS["free"], concurrency: int = 16,
+                      checkpoint: str = None, max_tries: int = 5, full: bool = False,
+                      fetch=refresh_symbol, log=print) -> Checkpoint:
+    """
+    asyncio variant of prime(): up to ``concurrency`` refreshes in flight, paced
+    by the same token bucket, with waits and backoff sleeps costing no thread.
+    The HTTP call itself is blocking (requests), so it runs on an executor over
+    the pooled keep-alive session; the token for a refresh's first call is
+    awaited, a second (gap-filling) call waits for its token on that thread.
+    """
+    state = Checkpoint(checkpoint)
+    todo = [s for s in symbols if s not in state.done]
+    bucket = TokenBucket(rate_per_min, burst=min(concurrency, max(1, int(rate_per_min))))
+    gate = asyncio.Semaphore(concurrency)
+    loop = asyncio.get_running_loop()
+    log(f"{len(symbols) - len(todo)} already done, {len(todo)} to fetch at {rate_per_min}/min")
+
+    async def run(symbol, executor):
+        async with gate:
+            for attempt in range(1, max_tries + 1):
+                await bucket.acquire_async()
+                try:
+                    df = await loop.run_in_executor(
+                        executor, functools.partial(fetch, symbol, full=full, pace=_Prepaid(bucket)))
+                    return symbol, len(df), None
+                except (DataError, OSError) as e:
+                    if attempt == max_tries:
+                        return symbol, 0, str(e)[:240]
+                    delay = backoff(attempt)
+                    log(f"[{symbol} try {attempt}] {str(e)[:80]}; retrying in {delay:.1f}s")
+                    await asyncio.sleep(delay)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for fut in asyncio.as_completed([run(s, executor) for s in todo]):
+            symbol, rows, error = await fut
+            state.mark(symbol, error)
+            log(f"{symbol}: {'FAILED ' + error if error else f'{rows} rows'}")
+    return state
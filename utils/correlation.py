@@ -0,0 +1,171 @@
+"""
+Pairwise covariance/correlation across a universe, full-range and rolling.
+
+A dense rolling (T x N x N) cube is out of reach at 200 symbols (6,500 x 200 x
+200 doubles is 2 GB) and a chart only needs a few hundred points, so the
+rolling engine slides one window between sampled rows instead: the pairwise
+sums for the next row are the current sums plus the rows that entered the
+window minus the rows that left it, each a small block matrix product. Total
+work is about two passes of X'X over the history however many rows are
+sampled. Missing quotes are handled pairwise (each pair uses the rows where
+both symbols trade), like pandas' DataFrame.corr.
+
+Rolling summaries are cached per (symbols, range, window), so flipping
+between pairs or revisiting a window does not rerun the engine.
+"""
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+from utils.analytics import _2d, returns, window_bounds
+from utils.arena import close_panel
+from utils.data import STORE
+
+ROLLING_CACHE_ENTRIES = int(os.getenv("CORR_CACHE_ENTRIES", "32"))
+
+
+def _block(x, v, lo: int, hi: int):
+    """Pairwise sums over rows lo:hi -> [sum xy, sum x (where y valid), sum x^2 (where y valid), n]."""
+    xb, vb = x[lo:hi], v[lo:hi]
+    return [xb.T @ xb, xb.T @ vb, (xb * xb).T @ vb, vb.T @ vb]
+
+
+def _finish(sums, min_periods: int):
+    """Pairwise sums -> (cov, corr), NaN for pairs with fewer than ``min_periods`` common rows."""
+    sxy, sx, sxx, n = sums
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = (sxy - sx * sx.T / n) / (n - 1)
+        var = (sxx - sx * sx / n) / (n - 1)   # var[i, j]: variance of i over the rows it shares with j
+        corr = np.clip(cov / np.sqrt(var * var.T), -1.0, 1.0)
+    short = (n < max(min_periods, 2))
+    cov[short] = np.nan
+    corr[short] = np.nan
+    return cov, corr
+
+
+def _prepare(rets):
+    rets = _2d(rets)
+    valid = ~np.isnan(rets)
+    return np.where(valid, rets, 0.0), valid.astype(np.float64)
+
+
+def corr_matrix(rets, min_periods: int = 2):
+    """(cov, corr) over all rows of ``rets`` (dates x symbols)."""
+    x, v = _prepare(rets)
+    return _finish(_block(x, v, 0, len(x)), min_periods)
+
+
+def rolling_cov(rets, window: int, rows, min_periods: int = None):
+    """
+    Yield (row, cov, corr) for the ``window``-row window ending at each of
+    ``rows`` (ascending row indexes into ``rets``), updating the pairwise sums
+    incrementally from one requested row to the next.
+    """
+    min_periods = window if min_periods is None else min_periods
+    x, v = _prepare(rets)
+    sums, lo, hi = None, 0, 0   # sums cover rows lo:hi
+    for r in rows:
+        new_hi = int(r) + 1
+        new_lo = max(0, new_hi - window)
+        if sums is None or new_lo >= hi:
+            # no overlap with the previous window: start over
+            sums = _block(x, v, new_lo, new_hi)
+        else:
+            entered, left = _block(x, v, hi, new_hi), _block(x, v, lo, new_lo)
+            sums = [s + a - b for s, a, b in zip(sums, entered, left)]
+        lo, hi = new_lo, new_hi
+        cov, corr = _finish(sums, min_periods)
+        yield int(r), cov, corr
+
+
+def mean_offdiag(corr) -> float:
+    """Average pairwise correlation (upper triangle, NaN pairs skipped); the diversification gauge."""
+    # the matrix is symmetric, so whole-matrix sums minus the diagonal count every pair twice
+    diag = np.diagonal(corr)
+    total = np.nansum(corr) - np.nansum(diag)
+    count = np.count_nonzero(~np.isnan(corr)) - np.count_nonzero(~np.isnan(diag))
+    return float(total / count) if count else np.nan
+
+
+def rolling_pair_corr(a, b, window: int, min_periods: int = None) -> np.ndarray:
+    """Rolling correlation of two return columns at every row, on the rows where both are quoted."""
+    min_periods = window if min_periods is None else min_periods
+    both = ~(np.isnan(a) | np.isnan(b))
+    a, b = np.where(both, a, 0.0), np.where(both, b, 0.0)
+
+    def rolled(s):
+        c = np.cumsum(s)
+        out = c.copy()
+        out[window:] -= c[:-window]
+        return out
+
+    n, sa, sb = rolled(both.astype(np.float64)), rolled(a), rolled(b)
+    saa, sbb, sab = rolled(a * a), rolled(b * b), rolled(a * b)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cov = sab - sa * sb / n
+        out = np.clip(cov / np.sqrt((saa - sa * sa / n) * (sbb - sb * sb / n)), -1.0, 1.0)
+    out[n < max(min_periods, 2)] = np.nan
+    return out
+
+
+def sample_rows(lo: int, hi: int, points: int) -> np.ndarray:
+    """About ``points`` evenly spaced rows in lo:hi, always including the last one."""
+    if hi <= lo:
+        return np.empty(0, dtype=np.int64)
+    step = max(1, -(-(hi - lo) // max(points, 1)))
+    rows = np.arange(hi - 1, lo - 1, -step)[::-1]
+    return rows
+
+
+def return_panel(symbols, end=None):
+    """(dates, daily returns) for ``symbols`` over their full history up to ``end``."""
+    dates, mat = close_panel(symbols, None, end)
+    return dates, returns(mat)
+
+
+class _RollingCache:
+    """LRU of rolling summaries keyed by (symbols, range, window, points, store version)."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        with self._lock:
+            hit = self._entries.get(key)
+            if hit is not None:
+                self._entries.move_to_end(key)
+                return hit
+        value = build()
+        with self._lock:
+            self._entries[key] = value
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+_ROLLING = _RollingCache(ROLLING_CACHE_ENTRIES)
+
+
+def rolling_mean_corr(symbols, window: int, start=None, end=None, points: int = 600):
+    """
+    (dates, mean pairwise correlation) of ``symbols`` over ``window``-day
+    windows ending at about ``points`` rows between start and end. Windows
+    reach back before ``start`` so the first point is already a full window.
+    """
+    def build():
+        dates, rets = return_panel(symbols, end)
+        lo, hi = window_bounds(dates, start, end)
+        rows = sample_rows(lo, hi, points)
+        means = np.array([mean_offdiag(corr) for _, _, corr in rolling_cov(rets, window, rows)])
+        return dates[rows], means
+
+    key = (tuple(symbols), window, str(start), str(end), points, STORE.version())
+    return _ROLLING.get(key, build)
@@ -1,121 +1,442 @@
+import io
 import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from functools import reduce
+import numpy as np
 import pandas as pd
 import requests
-from io import StringIO
+import requests.adapters
 from datetime import datetime
 from dotenv import load_dotenv
 load_dotenv()
 
-BASE = "https://www.alphavantage.co/query"
+from utils.analytics import ffill as ffill_columns, resample_ohlc, window_bounds
+from utils.store import COLUMNS, PriceStore, coerce
+
+try:
+    import fcntl
+except ImportError:          # Windows: fetches are only deduplicated within a process
+    fcntl = None
+
+# Cached frames are shared between callbacks. This relies on pandas 3's
+# copy-on-write (see requirements.txt): derived frames (filters, new columns)
+# copy lazily instead of mutating the cached one.
+
+BASE = os.getenv("ALPHAVANTAGE_BASE_URL", "https://www.alphavantage.co/query")
 API_KEY = os.getenv("ALPHAVANTAGE_API_KEY", "")
 
 TICKERS_DEFAULT = ["AAPL", "MSFT"]
 CACHE_DIR = "data_cache"
+# outputsize=compact returns the latest 100 sessions (~140 calendar days); keep a margin
+COMPACT_MAX_AGE_DAYS = 120
+# Compact frames: float32 prices (as stored) and a categorical symbol instead of
+# float64 and a string per row; roughly a third of the bytes per cached row.
+COMPACT_FRAMES = os.getenv("COMPACT_FRAMES", "0") == "1"
 os.makedirs(CACHE_DIR, exist_ok=True)
 
+# One OHLCV file per symbol; backend picked by PRICE_STORE (parquet/feather/csv).
+STORE = PriceStore(CACHE_DIR)
+
 class DataError(Exception):
     pass
 
-def _cache_path(symbol: str) -> str:
-    return os.path.join(CACHE_DIR, f"{symbol}_daily.csv")
+class _PriceCache:
+    """Byte-bounded LRU of frames keyed by (symbol, kind), valid while the store file mtime matches."""
 
-def _ohlc_cache_path(symbol: str) -> str:
-    return os.path.join(CACHE_DIR, f"{symbol}_daily_ohlc.csv")
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = 0
+        self._entries = OrderedDict()   # key -> (mtime, frame, nbytes)
+        self._lock = threading.Lock()
 
-def _read_cache(path: str, parse_dates=None) -> pd.DataFrame:
-    if os.path.exists(path):
-        return pd.read_csv(path, parse_dates=parse_dates or [])
-    raise DataError("Cache not found.")
+    def get(self, key, mtime):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != mtime:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            # shallow copy: callers can add columns without touching the cached object
+            return entry[1].copy(deep=False)
 
-def _fetch_csv(url: str) -> pd.DataFrame:
-    """Fetch URL and ensure we actually got CSV (not a throttle JSON)."""
-    r = requests.get(url, timeout=30)
-    r.raise_for_status()
-    text = r.text.strip()
+    def put(self, key, mtime, frame: pd.DataFrame) -> pd.DataFrame:
+        nbytes = int(frame.memory_usage(deep=True).sum())
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= old[2]
+            if nbytes <= self.max_bytes:
+                self._entries[key] = (mtime, frame, nbytes)
+                self.bytes += nbytes
+            while self.bytes > self.max_bytes and self._entries:
+                _, (_, _, n) = self._entries.popitem(last=False)
+                self.bytes -= n
+                self.evictions += 1
+        return frame.copy(deep=False)
 
-    # Alpha Vantage returns JSON error/throttle text even when datatype=csv
-    looks_like_json = text.startswith("{") or '"Note"' in text or '"Information"' in text
-    if looks_like_json or "Thank you for using Alpha Vantage" in text:
-        raise DataError(f"Alpha Vantage throttled or returned a JSON error: {text[:240]}")
+    def invalidate(self, symbol: str = None) -> None:
+        with self._lock:
+            for key in [k for k in self._entries if symbol is None or k[0] == symbol]:
+                self.bytes -= self._entries.pop(key)[2]
 
-    return pd.read_csv(StringIO(text))
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "entries": len(self._entries), "bytes": self.bytes, "max_bytes": self.max_bytes}
 
-def fetch_daily(symbol: str, force: bool = False) -> pd.DataFrame:
-    """Close-only CSV -> date, close, symbol."""
-    cp = _cache_path(symbol)
+_CACHE = _PriceCache(int(float(os.getenv("PRICE_CACHE_MB", "256")) * 1024 * 1024))
 
-    if not force and os.path.exists(cp):
-        return _read_cache(cp, parse_dates=["date"])
+def cache_stats() -> dict:
+    """Hit/miss/eviction counters and current size of the in-process price cache."""
+    return _CACHE.stats()
 
-    if not API_KEY:
-        # no key: best effort – serve cache or fail clearly
-        return _read_cache(cp, parse_dates=["date"])
+def clear_price_cache(symbol: str = None) -> None:
+    _CACHE.invalidate(symbol)
 
-    url = (f"{BASE}?function=TIME_SERIES_DAILY&symbol={symbol}"
-           f"&outputsize=full&datatype=csv&apikey={API_KEY}")
+class _SingleFlight:
+    """Collapse concurrent calls with the same key into one; waiters share its result or exception."""
+
+    def __init__(self):
+        self.shared = 0                 # calls answered by another thread's work
+        self._calls = {}                # key -> [done event, result, error]
+        self._lock = threading.Lock()
+
+    def do(self, key, fn):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = [threading.Event(), None, None]
+            else:
+                self.shared += 1
+        if not leader:
+            call[0].wait()
+            if call[2] is not None:
+                raise call[2]
+            return call[1]
+        try:
+            call[1] = fn()
+        except BaseException as e:
+            call[2] = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call[0].set()
+        return call[1]
+
+_FLIGHTS = _SingleFlight()
 
+@contextmanager
+def _symbol_lock(symbol: str):
+    """Exclusive per-symbol lock shared by every process using CACHE_DIR (flock; no-op without fcntl)."""
+    if fcntl is None:
+        yield
+        return
+    path = os.path.join(CACHE_DIR, "locks", f"{symbol}.lock")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        yield
+
+def _cached(symbol: str, kind: str, build) -> pd.DataFrame:
+    """Serve ``build()`` through the LRU; entries die when the symbol's store file changes."""
+    hit = _CACHE.get((symbol, kind), STORE.mtime(symbol))
+    if hit is not None:
+        return hit
+    # concurrent misses for the same view share one build (and one fetch/parse)
+    def build_and_put():
+        # stamp with the version seen *before* reading: a write racing the build leaves
+        # the entry stale. Only a build that created the file (a fetch) takes the new one.
+        seen = STORE.mtime(symbol)
+        df = build()
+        return _CACHE.put((symbol, kind), STORE.mtime(symbol) if seen is None else seen, df)
+    return _FLIGHTS.do((symbol, kind), build_and_put).copy(deep=False)
+
+def _read_cache(symbol: str, columns=None) -> pd.DataFrame:
+    """Stored frame for ``symbol`` (date index, typed columns)."""
     try:
-        df = _fetch_csv(url)
-    except DataError:
-        # fall back to cache if we got throttled or errored
-        return _read_cache(cp, parse_dates=["date"])
+        return STORE.read(symbol, columns=columns)
+    except FileNotFoundError:
+        raise DataError(f"No cached data for {symbol}.")
+
+def _long(frame: pd.DataFrame, columns, symbol: str) -> pd.DataFrame:
+    """Store frame -> the long layout the pages use: date, <columns...>, symbol."""
+    if COMPACT_FRAMES:
+        # keep the stored float32 values; one category code per row instead of a string
+        df = frame[columns].reset_index()
+        df["symbol"] = pd.Categorical.from_codes(np.zeros(len(df), dtype=np.int8), categories=[symbol])
+        return df[["date", *columns, "symbol"]]
+    # prices are float32 on disk; round off the widening noise (Alpha Vantage quotes <= 4 dp)
+    df = frame[columns].astype("float64").round(4).reset_index()
+    df["symbol"] = symbol
+    return df[["date", *columns, "symbol"]]
+
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "16"))
+_SESSION = None                  # (pid, requests.Session)
+_SESSION_LOCK = threading.Lock()
+
+def _session() -> requests.Session:
+    """This process's keep-alive session; repeat calls reuse pooled connections (no new TLS handshake)."""
+    global _SESSION
+    with _SESSION_LOCK:
+        # sockets must not be shared with a forked parent/child, so the pool is per pid
+        if _SESSION is None or _SESSION[0] != os.getpid():
+            session = requests.Session()
+            adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=HTTP_POOL_SIZE)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            _SESSION = (os.getpid(), session)
+        return _SESSION[1]
+
+class _ChunkStream(io.RawIOBase):
+    """Read-only file over an iterator of byte chunks, so pandas parses the body as it arrives."""
+
+    def __init__(self, first: bytes, rest):
+        self._buf, self._rest = first, rest
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        while not self._buf:
+            self._buf = next(self._rest, None)
+            if self._buf is None:
+                return 0
+        n = min(len(b), len(self._buf))
+        b[:n], self._buf = self._buf[:n], self._buf[n:]
+        return n
+
+def _fetch_csv(url: str) -> pd.DataFrame:
+    """Fetch URL and ensure we actually got CSV (not a throttle JSON); the body is parsed while streaming."""
+    with _session().get(url, timeout=30, stream=True) as r:
+        r.raise_for_status()
+        chunks = r.iter_content(chunk_size=1 << 16)
+        head = next(chunks, b"").lstrip()
+
+        # Alpha Vantage returns JSON error/throttle text even when datatype=csv
+        looks_like_json = head.startswith(b"{") or b'"Note"' in head or b'"Information"' in head
+        if looks_like_json or b"Thank you for using Alpha Vantage" in head:
+            text = (head + b"".join(chunks)).decode("utf-8", "replace").strip()
+            raise DataError(f"Alpha Vantage throttled or returned a JSON error: {text[:240]}")
+
+        return pd.read_csv(io.BufferedReader(_ChunkStream(head, chunks)))
+
+def _download(symbol: str, outputsize: str, pace=None) -> pd.DataFrame:
+    """One TIME_SERIES_DAILY call -> store-layout OHLCV frame; ``pace()`` runs before the call."""
+    if pace is not None:
+        pace()
+    url = (f"{BASE}?function=TIME_SERIES_DAILY&symbol={symbol}"
+           f"&outputsize={outputsize}&datatype=csv&apikey={API_KEY}")
+    df = _fetch_csv(url)
 
     # Expected columns: timestamp, open, high, low, close, volume
-    if "timestamp" not in df.columns or "close" not in df.columns:
+    if "timestamp" not in df.columns or not {"open","high","low","close"}.issubset(df.columns):
         raise DataError(f"Unexpected CSV schema from Alpha Vantage for {symbol}: {df.columns.tolist()}")
 
-    df = df.rename(columns={"timestamp": "date"})
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-    df["close"] = pd.to_numeric(df["close"], errors="coerce")
-    df = df.dropna(subset=["date", "close"]).sort_values("date")
-    df["symbol"] = symbol
-    df = df[["date", "close", "symbol"]]
-    df.to_csv(cp, index=False)
+    df = coerce(df.rename(columns={"timestamp": "date"}))
+    return df.dropna(subset=["open", "high", "low", "close"])
+
+def last_cached_date(symbol: str):
+    """Last stored trading date for ``symbol`` or None if nothing is stored."""
+    try:
+        idx = _read_cache(symbol, columns=["close"]).index
+    except DataError:
+        return None
+    return idx.max() if len(idx) else None
+
+def refresh_symbol(symbol: str, full: bool = False, pace=None) -> pd.DataFrame:
+    """
+    Bring ``symbol`` up to date. When the stored history ends inside the
+    compact window only the latest ~100 sessions are pulled and merged (new
+    rows win on overlapping dates); otherwise, or when that tail leaves a gap,
+    the full history is downloaded, so a refresh makes one or two API calls.
+    ``pace()`` (e.g. a rate limiter's acquire) runs before each of them.
+    Both the close and OHLC views read the merged file.
+    """
+    with _symbol_lock(symbol):
+        return _refresh(symbol, full, pace)
+
+def _refresh(symbol: str, full: bool, pace=None) -> pd.DataFrame:
+    # caller holds _symbol_lock(symbol)
+    last = None if full else last_cached_date(symbol)
+    stale_days = (pd.Timestamp.today().normalize() - last).days if last is not None else None
+
+    if stale_days is None or stale_days > COMPACT_MAX_AGE_DAYS:
+        df = _download(symbol, "full", pace)
+    else:
+        tail = _download(symbol, "compact", pace)
+        if tail.empty or tail.index.min() > last:
+            # compact tail does not reach back to what we have; avoid leaving a gap
+            df = _download(symbol, "full", pace)
+        else:
+            df = pd.concat([_read_cache(symbol), tail])
+
+    df = STORE.write(symbol, df)
+    _CACHE.invalidate(symbol)
     return df
 
+def _load(symbol: str, force: bool = False) -> pd.DataFrame:
+    """Stored OHLCV frame for ``symbol``, refreshing it first if missing or forced."""
+    if not force and STORE.exists(symbol):
+        return _read_cache(symbol)
+
+    if not API_KEY:
+        # no key: best effort – serve cache or fail clearly
+        return _read_cache(symbol)
+
+    # one download per symbol however many threads (single-flight) or workers (file lock) miss at once
+    seen = STORE.mtime(symbol)
+    return _FLIGHTS.do((symbol, "fetch"), lambda: _fetch_once(symbol, seen))
+
+def _fetch_once(symbol: str, seen) -> pd.DataFrame:
+    with _symbol_lock(symbol):
+        if STORE.mtime(symbol) != seen:
+            # another process wrote the file while we waited for the lock
+            return _read_cache(symbol)
+        try:
+            return _refresh(symbol, full=False)
+        except DataError:
+            # fall back to cache if we got throttled or errored
+            return _read_cache(symbol)
+
+def fetch_daily(symbol: str, force: bool = False) -> pd.DataFrame:
+    """Close-only view -> date, close, symbol."""
+    if force:
+        return _long(_load(symbol, force=True), ["close"], symbol)
+    return _cached(symbol, "close", lambda: _long(_load(symbol), ["close"], symbol))
+
+def data_version() -> int:
+    """Store-wide data version; increases on every price write (any symbol, any process)."""
+    return STORE.version()
+
+def get_meta(symbol: str) -> dict:
+    """First/last date and row count for ``symbol`` from the store index (no price parsing)."""
+    try:
+        return STORE.meta(symbol)
+    except FileNotFoundError:
+        raise DataError(f"No cached data for {symbol}.")
+
+def date_bounds(symbols=None):
+    """(min first date, max last date) across ``symbols`` as Timestamps."""
+    metas = [get_meta(s) for s in (symbols or TICKERS_DEFAULT)]
+    return (pd.Timestamp(min(m["first"] for m in metas)),
+            pd.Timestamp(max(m["last"] for m in metas)))
+
+def default_bounds(symbols=None, days: int = 365):
+    """
+    date_bounds(symbols), or the last ``days`` up to today while nothing is
+    cached yet (a callback that cannot load a picked symbol shows a message).
+    """
+    try:
+        return date_bounds(symbols)
+    except DataError:
+        today = pd.Timestamp.today().normalize()
+        return today - pd.Timedelta(days=days), today
+
 def get_prices(symbols=None) -> pd.DataFrame:
     symbols = symbols or TICKERS_DEFAULT
     frames = [fetch_daily(s) for s in symbols]
     return pd.concat(frames, ignore_index=True)
 
-def normalize_to_100(prices: pd.DataFrame) -> pd.DataFrame:
-    df = prices.sort_values(["symbol", "date"]).copy()
-    df["norm"] = df.groupby("symbol")["close"].transform(lambda s: 100 * s / s.iloc[0])
-    return df[["date", "symbol", "norm"]]
+def _stored(symbol: str) -> pd.DataFrame:
+    """Stored OHLCV frame (date index) from the per-process cache; read once per data version."""
+    return _cached(symbol, "stored", lambda: _load(symbol))
 
-def _fetch_daily_ohlc(symbol: str, force: bool = False) -> pd.DataFrame:
-    """OHLC CSV -> date, open, high, low, close, symbol."""
-    cp = _ohlc_cache_path(symbol)
+def get_panel(symbols, start=None, end=None, fields=("close",), how: str = "union",
+              ffill: bool = False, frame: bool = False):
+    """
+    Several symbols aligned on one date axis in a single call ->
+    (dates, {field: (T, N) float64 matrix}), one column per symbol in the
+    given order, NaN where a symbol has no row.
 
-    if not force and os.path.exists(cp):
-        return _read_cache(cp, parse_dates=["date"])
+    ``how`` "union" keeps every date any symbol traded, "inner" only the dates
+    all of them share. Windows are binary searches on each symbol's sorted
+    dates, and each symbol's rows on the shared axis are located once for all
+    fields. Close-only panels are sliced from the memory-mapped arena where it
+    holds current prices for a symbol. With ``ffill``, price gaps after a
+    symbol's first quote carry its last open/high/low/close forward; volume
+    stays NaN there, since nothing traded.
+    ``frame=True`` returns one DataFrame instead: date index, (field, symbol) columns.
+    """
+    from utils.arena import get_arena   # the arena module builds on this one
 
-    if not API_KEY:
-        return _read_cache(cp, parse_dates=["date"])
+    fields = [fields] if isinstance(fields, str) else list(fields)
+    unknown = sorted(set(fields) - set(COLUMNS))
+    if unknown:
+        raise ValueError(f"Unknown fields {unknown}; expected some of {list(COLUMNS)}")
+    if how not in ("union", "inner"):
+        raise ValueError(f"how must be 'union' or 'inner', not {how!r}")
 
-    url = (f"{BASE}?function=TIME_SERIES_DAILY&symbol={symbol}"
-           f"&outputsize=full&datatype=csv&apikey={API_KEY}")
+    arena = get_arena() if fields == ["close"] else None
+    parts = []   # (dates, {field: values}) per symbol, views into the arena or cached frames
+    for s in symbols:
+        if arena is not None and s in arena:
+            d, close = arena.window(s, start, end)
+            parts.append((d, {"close": close}))
+            continue
+        df = _stored(s)
+        if df.empty:
+            raise DataError(f"No data for {s}.")
+        lo, hi = window_bounds(df.index.values, start, end)
+        parts.append((df.index.values[lo:hi].astype("datetime64[D]"),
+                      {f: df[f].to_numpy()[lo:hi] for f in fields}))
 
-    try:
-        df = _fetch_csv(url)
-    except DataError:
-        return _read_cache(cp, parse_dates=["date"])
+    # the shared axis, computed once
+    if not parts:
+        dates = np.empty(0, dtype="datetime64[D]")
+    elif all(len(d) == len(parts[0][0]) and np.array_equal(d, parts[0][0]) for d, _ in parts[1:]):
+        dates = np.asarray(parts[0][0])
+    elif how == "union":
+        dates = np.unique(np.concatenate([d for d, _ in parts]))
+    else:
+        dates = reduce(lambda a, b: np.intersect1d(a, b, assume_unique=True), [d for d, _ in parts])
 
-    if "timestamp" not in df.columns or not {"open","high","low","close"}.issubset(df.columns):
-        raise DataError(f"Unexpected CSV schema (OHLC) for {symbol}: {df.columns.tolist()}")
+    out = {f: np.full((len(dates), len(parts)), np.nan) for f in fields}
+    for j, (d, values) in enumerate(parts):
+        if len(d) == len(dates):   # already on the shared axis
+            rows, keep = slice(None), slice(None)
+        else:
+            rows = np.searchsorted(dates, d)
+            keep = rows < len(dates)
+            keep[keep] = dates[rows[keep]] == d[keep]   # "inner" drops this symbol's extra dates
+            rows = rows[keep]
+        for f in fields:
+            out[f][rows, j] = values[f][keep]
+    for f in fields:
+        if f == "volume":
+            continue   # no trades on a missing day: never carried forward
+        # prices are float32 on disk; round off the widening noise like the long views do
+        np.round(out[f], 4, out=out[f])
+        if ffill:
+            out[f] = ffill_columns(out[f])
 
-    df = df.rename(columns={"timestamp": "date"})
-    df["date"] = pd.to_datetime(df["date"], errors="coerce")
-    for col in ["open","high","low","close"]:
-        df[col] = pd.to_numeric(df[col], errors="coerce")
-    df = df.dropna(subset=["date","open","high","low","close"]).sort_values("date")
-    df["symbol"] = symbol
-    df = df[["date", "open", "high", "low", "close", "symbol"]]
-    df.to_csv(cp, index=False)
-    return df
+    if frame:
+        columns = pd.MultiIndex.from_product([fields, list(symbols)], names=["field", "symbol"])
+        data = np.concatenate([out[f] for f in fields], axis=1) if fields else np.empty((len(dates), 0))
+        return pd.DataFrame(data, index=pd.DatetimeIndex(dates.astype("datetime64[ns]"), name="date"),
+                            columns=columns)
+    return dates, out
+
+def _fetch_daily_ohlc(symbol: str, force: bool = False) -> pd.DataFrame:
+    """OHLC view -> date, open, high, low, close, symbol."""
+    cols = ["open", "high", "low", "close"]
+    if force:
+        return _long(_load(symbol, force=True), cols, symbol)
+    return _cached(symbol, "ohlc", lambda: _long(_load(symbol), cols, symbol))
 
 def fetch_daily_ohlc(symbol: str, force: bool = False) -> pd.DataFrame:
     return _fetch_daily_ohlc(symbol, force=force)
 
 def get_ohlc(symbol: str) -> pd.DataFrame:
     return fetch_daily_ohlc(symbol)
+
+def get_ohlc_bars(symbol: str, freq: str = "D") -> pd.DataFrame:
+    """OHLC bars for ``symbol`` at D/W/M/Q granularity, cached per symbol and granularity."""
+    if freq == "D":
+        return get_ohlc(symbol)
+    return _cached(symbol, f"ohlc_{freq}", lambda: resample_ohlc(get_ohlc(symbol), freq))
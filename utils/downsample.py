@@ -0,0 +1,101 @@
+"""
+Server-side downsampling for long line/area charts.
+
+A chart cannot show more distinct points than it has horizontal pixels, so
+series are reduced with Largest-Triangle-Three-Buckets (LTTB), which keeps the
+visual shape (peaks, crashes) while sending ~1 point per pixel. When the user
+zooms, the visible range is resampled at full pixel budget and the rest of the
+series is kept coarse, so detail appears on zoom without shipping everything.
+"""
+import numpy as np
+import pandas as pd
+from dash import ClientsideFunction, Input, Output, clientside_callback
+
+DEFAULT_WIDTH_PX = 1200
+OUTSIDE_SHARE = 0.125      # point budget for each off-screen side, relative to the visible budget
+
+
+def budget_px(width_px) -> int:
+    """Chart width rounded to 100 px, so near-identical widths share cached figures."""
+    return max(100, int(round((width_px or DEFAULT_WIDTH_PX) / 100.0)) * 100)
+
+
+def register_width(store_id: str, graph_id: str) -> None:
+    """Measure ``graph_id``'s width in the browser (assets/charts.js) into the ``store_id`` store."""
+    clientside_callback(ClientsideFunction(namespace="charts", function_name="width"),
+                        Output(store_id, "data"), Input(graph_id, "id"))
+
+
+def lttb_indices(x, y, n_out: int) -> np.ndarray:
+    """Indices of the LTTB selection of ``n_out`` points from (x, y); NaN points are never picked."""
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    keep = np.flatnonzero(~np.isnan(y))
+    n = len(keep)
+    if n_out >= n or n_out < 3:
+        return keep
+    xs, ys = x[keep], y[keep]
+
+    # bucket edges over the interior points; first and last points are always kept
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        nlo, nhi = edges[i + 1], (edges[i + 2] if i + 2 < len(edges) else n)
+        cx, cy = xs[nlo:nhi].mean(), ys[nlo:nhi].mean()
+        # area of the triangle (a, candidate, next-bucket centroid), up to a constant factor
+        area = np.abs((xs[a] - cx) * (ys[lo:hi] - ys[a]) - (xs[a] - xs[lo:hi]) * (cy - ys[a]))
+        a = lo + int(area.argmax())
+        out[i + 1] = a
+    return keep[out]
+
+
+def _days(dates) -> np.ndarray:
+    return np.asarray(dates).astype("datetime64[D]").astype(np.int64).astype(np.float64)
+
+
+def select(dates, y, width_px: int = None, visible=None) -> np.ndarray:
+    """
+    Indices to plot for one series: ~``width_px`` points across the visible
+    range (the whole series when ``visible`` is None) and a coarse outline
+    outside it.
+    """
+    budget = int(width_px or DEFAULT_WIDTH_PX)
+    x = _days(dates)
+    if visible is None:
+        return lttb_indices(x, y, budget)
+    v0, v1 = (_days([np.datetime64(pd.Timestamp(v), "D")])[0] for v in visible)
+    lo, hi = np.searchsorted(x, v0, "left"), np.searchsorted(x, v1, "right")
+    side = max(3, int(budget * OUTSIDE_SHARE))
+    parts = [lttb_indices(x[:lo], y[:lo], side),
+             lo + lttb_indices(x[lo:hi], y[lo:hi], budget),
+             hi + lttb_indices(x[hi:], y[hi:], side)]
+    return np.concatenate(parts)
+
+
+def downsample_shared(dates, mat, width_px: int = None, visible=None):
+    """
+    One selection for all columns (picked on the row totals) -> (dates, matrix).
+    Stacked area traces need identical x values or plotly fills the gaps with zeros.
+    """
+    total = np.where(np.isnan(mat).all(axis=1), np.nan, np.nansum(mat, axis=1)) if mat.size else np.empty(0)
+    idx = select(dates, total, width_px, visible)
+    return np.asarray(dates)[idx], mat[idx]
+
+
+def visible_range(relayout):
+    """(start, end) of the x-axis from a dcc.Graph relayoutData event, or None for the full view."""
+    if not relayout or relayout.get("xaxis.autorange"):
+        return None
+    if "xaxis.range[0]" in relayout and "xaxis.range[1]" in relayout:
+        return relayout["xaxis.range[0]"], relayout["xaxis.range[1]"]
+    if isinstance(relayout.get("xaxis.range"), (list, tuple)) and len(relayout["xaxis.range"]) == 2:
+        return tuple(relayout["xaxis.range"])
+    return None
+
+
+def is_zoom_event(relayout) -> bool:
+    """True if a relayoutData event changes the x-axis (zoom, pan, range slider, reset)."""
+    return bool(relayout) and any(k.startswith("xaxis.range") or k == "xaxis.autorange" for k in relayout)
@@ -0,0 +1,103 @@
+"""
+Precomputed per-symbol derived series, built for the whole universe on a process pool.
+
+After a refresh (or at startup, or from scripts/precompute.py) every symbol
+whose prices changed gets its derived series rebuilt in parallel and saved next
+to its prices in data_cache/derived/, stamped with the price version they were
+computed from. Request handlers only look them up; a stale stamp reads as
+missing, so new prices are never shown with old indicators.
+
+Series per symbol:
+  features_v3  every configured indicator column (utils.indicators: sma20, ema12,
+               bb20_2_upper, ...); float32
+  volcube      annualized rolling vol for every /volatility slider window (utils.volcube)
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils import indicators
+from utils.data import STORE, _cached, fetch_daily
+from utils.volcube import cube_from_close
+
+FEATURES = "features_v3"   # bump the suffix whenever a column or its definition changes
+PRECOMPUTE_WORKERS = int(os.getenv("PRECOMPUTE_WORKERS", "0")) or os.cpu_count() or 1
+
+
+def features_from_close(close: pd.Series) -> pd.DataFrame:
+    """Indicator columns over the full history of a date-indexed close series."""
+    x = close.to_numpy(np.float64)
+    cols = {}
+    for spec in indicators.ALL_SPECS:
+        cols.update(indicators.compute(x, spec))
+    return pd.DataFrame(cols, index=close.index).astype(np.float32)
+
+
+DERIVED = {FEATURES: features_from_close, "volcube": cube_from_close}
+
+
+def build_symbol(symbol: str, force: bool = False) -> list:
+    """Rebuild ``symbol``'s stale derived series (every one with ``force``); returns the names written."""
+    stale = [name for name in DERIVED if force or not STORE.derived_fresh(symbol, name)]
+    if not stale or not STORE.exists(symbol):
+        return []
+    # stamp with the version read *before* the prices: a refresh racing this build leaves it stale
+    stamp = STORE.mtime(symbol)
+    close = STORE.read(symbol, columns=["close"])["close"]
+    for name in stale:
+        STORE.write_derived(symbol, name, DERIVED[name](close), stamp=stamp)
+    return stale
+
+
+def _task(symbol: str, force: bool):
+    """Pool entry point: one bad file must not abort the rest of the universe."""
+    try:
+        return build_symbol(symbol, force), None
+    except Exception as e:
+        return [], f"{type(e).__name__}: {e}"
+
+
+def precompute_all(symbols=None, workers: int = PRECOMPUTE_WORKERS, force: bool = False, log=None) -> dict:
+    """
+    Build stale derived series for ``symbols`` (default: every stored symbol)
+    on ``workers`` processes. Returns {symbol: [names rebuilt]} for the
+    symbols that needed work; failures are logged and skipped.
+    """
+    symbols = list(symbols or STORE.symbols())
+    t = time.perf_counter()
+    workers = max(1, min(workers, len(symbols)))
+    if workers == 1:
+        results = [_task(s, force) for s in symbols]
+    else:
+        # a few chunks per process balances uneven history lengths without per-symbol IPC
+        chunk = max(1, len(symbols) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_task, symbols, [force] * len(symbols), chunksize=chunk))
+
+    built = {}
+    for symbol, (names, error) in zip(symbols, results):
+        if error and log:
+            log(f"derived series for {symbol} failed: {error}")
+        if names:
+            built[symbol] = names
+    if log:
+        log(f"derived series rebuilt for {len(built)}/{len(symbols)} symbols "
+            f"in {time.perf_counter() - t:.1f}s on {workers} processes")
+    return built
+
+
+def features(symbol: str) -> pd.DataFrame:
+    """date-indexed indicators for ``symbol``: the saved series, or built and saved on a miss."""
+    def build():
+        if not STORE.exists(symbol):
+            fetch_daily(symbol)   # fetch on first use, same as the price views
+        df = STORE.read_derived(symbol, FEATURES)
+        if df is None:
+            stamp = STORE.mtime(symbol)
+            df = features_from_close(STORE.read(symbol, columns=["close"])["close"])
+            STORE.write_derived(symbol, FEATURES, df, stamp=stamp)
+        return df
+    return _cached(symbol, FEATURES, build)
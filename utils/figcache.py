@@ -0,0 +1,106 @@
+"""
+Memoized Plotly figures for the analytics callbacks.
+
+Callbacks build a key from their normalized inputs plus the data version of
+the symbols they plot; the serialized figure JSON is kept in a byte-bounded
+LRU. A refresh changes the symbols' version, so old figures are never served
+again and simply age out. Builders wrap messages ("data not available", empty
+selections) in Uncached so a retry rebuilds them instead of replaying them.
+"""
+import json
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import plotly.io as pio
+
+from utils.data import STORE, DataError
+
+
+def day(value):
+    """Date-ish callback input -> 'YYYY-MM-DD' (or None) so equivalent inputs share a key."""
+    return pd.Timestamp(value).strftime("%Y-%m-%d") if value else None
+
+
+def data_version(symbols) -> tuple:
+    """Per-symbol store version; changes whenever a symbol's prices are rewritten."""
+    return tuple((s, STORE.mtime(s)) for s in symbols)
+
+
+class Uncached:
+    """A built figure that ``FigureCache.cached`` returns without storing."""
+
+    def __init__(self, fig):
+        self.fig = fig
+
+
+class FigureCache:
+    """LRU of serialized figures bounded by total JSON bytes."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.hits = self.misses = self.evictions = 0
+        self._entries = OrderedDict()   # key -> json str
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            text = self._entries.get(key)
+            if text is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return json.loads(text)
+
+    def put(self, key, fig) -> None:
+        text = fig if isinstance(fig, str) else pio.to_json(fig, validate=False)
+        size = len(text)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes -= len(old)
+            if size > self.max_bytes:
+                return
+            self._entries[key] = text
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes -= len(evicted)
+                self.evictions += 1
+
+    def cached(self, key, build):
+        """Serve the figure for ``key`` or build, store and return it (Uncached results are not stored)."""
+        hit = self.get(key)
+        if hit is not None:
+            return hit
+        fig = build()
+        if isinstance(fig, Uncached):
+            return fig.fig
+        self.put(key, fig)
+        return fig
+
+    def cached_or_message(self, key, build, message):
+        """
+        ``cached(key, build)``, or ``message(text)`` when a symbol is offered by the
+        picker but not stored (and not fetchable now); the message is not cached.
+        """
+        try:
+            return self.cached(key, build)
+        except DataError as e:
+            return message(f"{e} Pick another ticker or try again later.")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                    "entries": len(self._entries), "bytes": self.bytes, "max_bytes": self.max_bytes}
+
+
+FIGURES = FigureCache(int(float(os.getenv("FIGURE_CACHE_MB", "64")) * 1024 * 1024))
@@ -0,0 +1,105 @@
+"""
+Price overlays for the /activity candles, computed by the vectorized kernels in utils.analytics.
+
+An indicator is named by a spec:
+  sma:20     simple moving average over 20 bars
+  ema:12     exponential moving average, span 12
+  bb:20:2    Bollinger bands: 20-bar mean +- 2 population standard deviations
+
+Specs are grouped into the sets offered on the page, configurable with
+INDICATOR_SETS="MA=sma:20,sma:50;EMA=ema:12,ema:26;Bollinger=bb:20:2" (the default).
+Every configured spec is part of the precomputed daily features; a window
+that is computed on the fly (aggregated candles) first reads lookback() bars
+from before it, so no indicator starts the visible window undefined.
+"""
+import os
+
+import numpy as np
+
+from utils.analytics import bollinger, ema, rolling_mean
+
+KINDS = ("sma", "ema", "bb")
+EMA_SETTLE = 10   # an EMA seeded span * 10 bars back is within ~2e-9 of one seeded at the first bar
+
+
+def parse_spec(spec: str):
+    """'bb:20:2' -> ('bb', 20, 2.0); ValueError if malformed."""
+    kind, *args = spec.strip().lower().split(":")
+    try:
+        window = int(args[0])
+        k = float(args[1]) if kind == "bb" and len(args) > 1 else 2.0
+    except (IndexError, ValueError):
+        raise ValueError(f"bad indicator spec {spec!r}") from None
+    if kind not in KINDS or window < 1 or len(args) > (2 if kind == "bb" else 1):
+        raise ValueError(f"bad indicator spec {spec!r}")
+    return kind, window, k
+
+
+def parse_sets(text: str) -> dict:
+    """'MA=sma:20,sma:50;EMA=ema:12' -> {'MA': ['sma:20', 'sma:50'], 'EMA': ['ema:12']}."""
+    sets = {}
+    for part in filter(None, (p.strip() for p in text.split(";"))):
+        name, _, specs = part.partition("=")
+        specs = [s.strip().lower() for s in specs.split(",") if s.strip()]
+        for s in specs:
+            parse_spec(s)   # fail at import on a typo, not on the first request
+        sets[name.strip()] = specs
+    return sets
+
+
+DEFAULT_SETS = "MA=sma:20,sma:50;EMA=ema:12,ema:26;Bollinger=bb:20:2"
+INDICATOR_SETS = parse_sets(os.getenv("INDICATOR_SETS", DEFAULT_SETS))
+ALL_SPECS = tuple(dict.fromkeys(s for specs in INDICATOR_SETS.values() for s in specs))
+
+
+def columns(spec: str) -> list:
+    """Output column names of ``spec``: one line, or mid/upper/lower for Bollinger bands."""
+    kind, window, k = parse_spec(spec)
+    if kind == "bb":
+        base = f"bb{window}_{k:g}"
+        return [f"{base}_mid", f"{base}_upper", f"{base}_lower"]
+    return [f"{kind}{window}"]
+
+
+def lookback(spec: str) -> int:
+    """Bars before a window needed for ``spec`` to be complete on the window's first bar."""
+    kind, window, _ = parse_spec(spec)
+    return window * EMA_SETTLE if kind == "ema" else window - 1
+
+
+def compute(close, spec: str) -> dict:
+    """{column: 1-D float64 array} of ``spec`` over a 1-D close array."""
+    kind, window, k = parse_spec(spec)
+    x = np.asarray(close, dtype=np.float64)
+    if kind == "sma":
+        lines = [rolling_mean(x, window)]
+    elif kind == "ema":
+        lines = [ema(x, window)]
+    else:
+        lines = list(bollinger(x, window, k))
+    return {name: line[:, 0] for name, line in zip(columns(spec), lines)}
+
+
+def window_values(close, lo: int, hi: int, specs) -> dict:
+    """
+    ``specs`` over rows lo:hi of a full close array, computed from a lookback
+    buffer starting max(lookback) rows before ``lo`` and then trimmed to the window.
+    """
+    specs = list(specs)
+    if not specs:
+        return {}
+    start = max(0, lo - max(lookback(s) for s in specs))
+    x = np.asarray(close, dtype=np.float64)[start:hi]
+    out = {}
+    for spec in specs:
+        out.update({name: v[lo - start:] for name, v in compute(x, spec).items()})
+    return out
+
+
+def label(spec: str, unit: str = "") -> list:
+    """Legend names for the columns of ``spec``; ``unit`` is e.g. ' weeks' on aggregated candles."""
+    kind, window, k = parse_spec(spec)
+    if kind == "bb":
+        base = f"BB {window}{unit}, {k:g}σ"
+        return [f"{base} mid", f"{base} upper", f"{base} lower"]
+    return [f"{'MA' if kind == 'sma' else 'EMA'} {window}{unit}"]
@@ -0,0 +1,184 @@
+"""
+Per-callback latency, phase timings and response sizes, served as Prometheus text.
+
+instrument() wraps every server-side Dash callback registered so far. Each call
+records its outcome, total latency, the time spent in the callback function vs.
+in Dash's JSON serialization of the response, the response size, and any phases
+the callback marks with ``with phase("load"):``. Cache hit ratios come from the
+price LRU and the figure cache. Counters are per process: with several gunicorn
+workers, each scrape reports the worker that answered it.
+"""
+import functools
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+import dash._callback as dash_callback
+from dash.exceptions import PreventUpdate
+
+from utils.data import _FLIGHTS, cache_stats
+from utils.figcache import FIGURES
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (1e3, 1e4, 5e4, 1e5, 2.5e5, 5e5, 1e6, 5e6)
+
+_phases = ContextVar("callback_phases", default=None)   # phase -> seconds for the running callback
+_lock = threading.Lock()
+_calls = {}        # (callback, outcome) -> count
+_latency = {}      # callback -> [bucket counts..., sum, count]
+_bytes = {}        # callback -> [bucket counts..., sum, count]
+_phase_sums = {}   # (callback, phase) -> [sum, count]
+
+CACHES = {"price": cache_stats, "figure": FIGURES.stats}
+
+
+@contextmanager
+def phase(name: str):
+    """Attribute the enclosed time to ``name`` (load, compute, figure...) in the current callback."""
+    phases = _phases.get()
+    if phases is None:
+        yield
+        return
+    t = time.perf_counter()
+    try:
+        yield
+    finally:
+        phases[name] = phases.get(name, 0.0) + time.perf_counter() - t
+
+
+def _observe(table: dict, key, buckets, value: float) -> None:
+    row = table.setdefault(key, [0] * (len(buckets) + 2))
+    for i, bound in enumerate(buckets):
+        if value <= bound:
+            row[i] += 1
+    row[-2] += value
+    row[-1] += 1
+
+
+def _record(callback: str, outcome: str, total: float, phases: dict, nbytes) -> None:
+    with _lock:
+        _calls[(callback, outcome)] = _calls.get((callback, outcome), 0) + 1
+        _observe(_latency, callback, LATENCY_BUCKETS, total)
+        if nbytes is not None:
+            _observe(_bytes, callback, BYTES_BUCKETS, nbytes)
+        for name, seconds in phases.items():
+            row = _phase_sums.setdefault((callback, name), [0.0, 0])
+            row[0] += seconds
+            row[1] += 1
+
+
+def _wrap(callback_id: str, entry: dict) -> bool:
+    handler = entry.get("callback")
+    if handler is None or getattr(handler, "_instrumented", False):
+        return False   # clientside callback, or already wrapped
+
+    # Dash's handler (add_context) calls the page function and then serializes the
+    # response; swapping the function in its closure separates the two
+    free = handler.__code__.co_freevars
+    if "func" in free:
+        cell = handler.__closure__[free.index("func")]
+        func = cell.cell_contents
+
+        @functools.wraps(func)
+        def timed_func(*args, **kwargs):
+            t = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                phases = _phases.get()
+                if phases is not None:
+                    phases["_function"] = time.perf_counter() - t
+
+        cell.cell_contents = timed_func
+
+    @functools.wraps(handler)
+    def instrumented(*args, **kwargs):
+        phases = {}
+        token = _phases.set(phases)
+        outcome, body = "ok", None
+        t = time.perf_counter()
+        try:
+            body = handler(*args, **kwargs)
+            return body
+        except PreventUpdate:
+            outcome = "prevented"   # no_update: nothing sent
+            raise
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            total = time.perf_counter() - t
+            _phases.reset(token)
+            function = phases.pop("_function", None)
+            if function is not None:
+                phases["other"] = max(0.0, function - sum(phases.values()))
+                phases["serialize"] = max(0.0, total - function)
+            _record(callback_id, outcome, total, phases,
+                    len(body.encode("utf-8")) if isinstance(body, str) else None)
+
+    instrumented._instrumented = True
+    entry["callback"] = instrumented
+    return True
+
+
+def instrument() -> int:
+    """Wrap every registered server callback; safe to call again after more pages register."""
+    return sum(_wrap(callback_id, entry) for callback_id, entry in list(dash_callback.GLOBAL_CALLBACK_MAP.items()))
+
+
+def _label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _histogram(lines: list, name: str, help_: str, table: dict, buckets) -> None:
+    lines += [f"# HELP {name} {help_}", f"# TYPE {name} histogram"]
+    for callback, row in sorted(table.items()):
+        cb = _label(callback)
+        for bound, count in zip(buckets, row):
+            lines.append(f'{name}_bucket{{callback="{cb}",le="{bound:g}"}} {count}')
+        lines.append(f'{name}_bucket{{callback="{cb}",le="+Inf"}} {row[-1]}')
+        lines.append(f'{name}_sum{{callback="{cb}"}} {row[-2]:.6f}')
+        lines.append(f'{name}_count{{callback="{cb}"}} {row[-1]}')
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    with _lock:
+        calls, latency = dict(_calls), {k: list(v) for k, v in _latency.items()}
+        nbytes, phases = {k: list(v) for k, v in _bytes.items()}, {k: list(v) for k, v in _phase_sums.items()}
+
+    lines = ["# HELP dash_callback_calls_total Server callback invocations by outcome.",
+             "# TYPE dash_callback_calls_total counter"]
+    for (callback, outcome), n in sorted(calls.items()):
+        lines.append(f'dash_callback_calls_total{{callback="{_label(callback)}",outcome="{outcome}"}} {n}')
+    _histogram(lines, "dash_callback_duration_seconds", "End-to-end server callback latency.",
+               latency, LATENCY_BUCKETS)
+    _histogram(lines, "dash_callback_response_bytes", "Size of the JSON response sent to the browser.",
+               nbytes, BYTES_BUCKETS)
+
+    lines += ["# HELP dash_callback_phase_seconds Time per callback phase (load, compute, figure, other, serialize).",
+              "# TYPE dash_callback_phase_seconds summary"]
+    for (callback, name), (total, n) in sorted(phases.items()):
+        labels = f'callback="{_label(callback)}",phase="{name}"'
+        lines.append(f"dash_callback_phase_seconds_sum{{{labels}}} {total:.6f}")
+        lines.append(f"dash_callback_phase_seconds_count{{{labels}}} {n}")
+
+    stats = {name: fn() for name, fn in CACHES.items()}
+    for metric, key, kind, help_ in [
+        ("app_cache_hits_total", "hits", "counter", "Cache lookups served from memory."),
+        ("app_cache_misses_total", "misses", "counter", "Cache lookups that had to build."),
+        ("app_cache_evictions_total", "evictions", "counter", "Entries dropped to stay within budget."),
+        ("app_cache_bytes", "bytes", "gauge", "Bytes currently held."),
+        ("app_cache_max_bytes", "max_bytes", "gauge", "Configured byte budget."),
+    ]:
+        lines += [f"# HELP {metric} {help_}", f"# TYPE {metric} {kind}"]
+        lines += [f'{metric}{{cache="{name}"}} {s[key]}' for name, s in stats.items()]
+    lines += ["# HELP app_cache_hit_ratio hits / (hits + misses) since start.", "# TYPE app_cache_hit_ratio gauge"]
+    for name, s in stats.items():
+        lookups = s["hits"] + s["misses"]
+        lines.append(f'app_cache_hit_ratio{{cache="{name}"}} {s["hits"] / lookups if lookups else 0:.4f}')
+    lines += ["# HELP app_singleflight_shared_total Loads answered by another thread's in-flight load.",
+              "# TYPE app_singleflight_shared_total counter",
+              f"app_singleflight_shared_total {_FLIGHTS.shared}"]
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,125 @@
+"""
+Symbol registry: the universe of tickers the dashboard can chart.
+
+Names and sectors come from ``data_cache/universe.csv`` (symbol,name,sector);
+coverage (first/last date, row count) from the price store's metadata index.
+The merged table is persisted to ``data_cache/_symbols.json`` and rebuilt only
+when either source changes, so searching never touches price files.
+"""
+import csv
+import json
+import os
+import threading
+
+from utils.data import CACHE_DIR, STORE
+
+UNIVERSE_PATH = os.getenv("SYMBOL_UNIVERSE", os.path.join(CACHE_DIR, "universe.csv"))
+REGISTRY_PATH = os.path.join(CACHE_DIR, "_symbols.json")
+PAGE_SIZE = 50
+
+
+def _read_universe(path: str = UNIVERSE_PATH) -> dict:
+    """symbol -> {"name", "sector"} from the universe CSV (empty if there is none)."""
+    try:
+        with open(path, newline="") as f:
+            rows = list(csv.DictReader(f))
+    except FileNotFoundError:
+        return {}
+    out = {}
+    for row in rows:
+        sym = (row.get("symbol") or "").strip().upper()
+        if sym:
+            out[sym] = {"name": (row.get("name") or "").strip(), "sector": (row.get("sector") or "").strip()}
+    return out
+
+
+def _stamp() -> list:
+    try:
+        universe = os.stat(UNIVERSE_PATH).st_mtime_ns
+    except FileNotFoundError:
+        universe = None
+    return [universe, STORE.index_mtime()]
+
+
+def build_registry(path: str = REGISTRY_PATH) -> list:
+    """Merge the universe with store coverage, write the index file and return its records."""
+    universe = _read_universe()
+    records = []
+    for sym in sorted(set(universe) | set(STORE.symbols())):
+        info = universe.get(sym, {"name": "", "sector": ""})
+        try:
+            meta = STORE.meta(sym)
+        except FileNotFoundError:
+            meta = {"first": None, "last": None, "rows": 0}
+        records.append({"symbol": sym, "name": info["name"], "sector": info["sector"],
+                        "first": meta["first"], "last": meta["last"], "rows": meta["rows"]})
+
+    # stamped after the build: reading legacy CSVs above may have migrated them into the index
+    payload = {"stamp": _stamp(), "symbols": records}
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(payload, f, indent=1)
+    os.replace(tmp, path)
+    return records
+
+
+_REGISTRY = None   # (stamp, records, by_symbol)
+_LOCK = threading.Lock()
+
+
+def registry() -> list:
+    """All registry records sorted by symbol; reloaded or rebuilt when a source changes."""
+    global _REGISTRY
+    stamp = _stamp()
+    with _LOCK:
+        if _REGISTRY is not None and _REGISTRY[0] == stamp:
+            return _REGISTRY[1]
+        try:
+            with open(REGISTRY_PATH) as f:
+                payload = json.load(f)
+            records = payload["symbols"] if payload.get("stamp") == stamp else None
+        except (FileNotFoundError, ValueError, KeyError):
+            records = None
+        if records is None:
+            records = build_registry()
+            stamp = _stamp()
+        _REGISTRY = (stamp, records, {r["symbol"]: r for r in records})
+        return records
+
+
+def lookup(symbol: str):
+    """Registry record for ``symbol`` or None."""
+    registry()
+    return _REGISTRY[2].get(symbol.upper())
+
+
+def _rank(record: dict, q: str):
+    """Sort key for a search hit, or None if ``record`` does not match ``q``."""
+    sym, name = record["symbol"], record["name"].lower()
+    if not q:
+        return (record["rows"] == 0, sym)   # cached symbols first
+    if sym == q.upper():
+        return (0, sym)
+    if sym.startswith(q.upper()):
+        return (1, sym)
+    if name.startswith(q) or f" {q}" in name:
+        return (2, sym)
+    if q in name or q.upper() in sym or q in record["sector"].lower():
+        return (3, sym)
+    return None
+
+
+def search(query: str = "", page: int = 0, page_size: int = PAGE_SIZE):
+    """
+    One page of symbols matching ``query`` (symbol, name or sector; exact and
+    prefix matches first) -> (records, total matches).
+    """
+    q = (query or "").strip().lower()
+    hits = []
+    for record in registry():
+        rank = _rank(record, q)
+        if rank is not None:
+            hits.append((rank, record))
+    hits.sort(key=lambda h: h[0])
+    start = max(0, page) * page_size
+    return [r for _, r in hits[start:start + page_size]], len(hits)
@@ -0,0 +1,120 @@
+"""
+Background refresh of stale symbols after the US market close.
+
+Requests do not refresh stale prices; they read whatever the store holds (only
+a symbol with no stored prices at all is downloaded on first use). This
+scheduler runs as a sidecar process (scripts/refresh_prices.py, which gunicorn
+starts when REFRESH_SCHEDULER=1), finds symbols whose last stored session is
+older than the latest completed one and refreshes them through the rate-limited
+bulk fetcher, then rebuilds their derived series on a process pool
+(utils.features). Store writes are atomic and bump the store's data version,
+so workers pick up new data on their next check. A symbol whose refresh still
+ends before the session (bars not published yet) is retried on later polls with
+exponential backoff, at most REFRESH_MAX_TRIES times per session.
+"""
+import os
+import threading
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pandas as pd
+
+from utils.arena import build_arena
+from utils.bulk import TIERS, prime
+from utils.data import STORE
+from utils.features import precompute_all
+
+MARKET_TZ = ZoneInfo("America/New_York")
+REFRESH_AFTER = os.getenv("REFRESH_AFTER", "17:00")   # market time; daily bars are published after the 16:00 close
+REFRESH_RATE = float(os.getenv("REFRESH_RATE_PER_MIN", TIERS["free"]))
+REFRESH_POLL_S = float(os.getenv("REFRESH_POLL_S", "300"))
+REFRESH_MAX_TRIES = int(os.getenv("REFRESH_MAX_TRIES", "6"))   # per symbol and session
+REFRESH_RETRY_CAP_S = 4 * 3600
+
+
+def last_session(now: datetime = None) -> pd.Timestamp:
+    """Latest weekday whose daily bar should be available (exchange holidays are not modelled)."""
+    now = now.astimezone(MARKET_TZ) if now else datetime.now(MARKET_TZ)
+    hh, mm = (int(x) for x in REFRESH_AFTER.split(":"))
+    day = pd.Timestamp(now.date())
+    if (now.hour, now.minute) < (hh, mm):
+        day -= pd.Timedelta(days=1)
+    while day.weekday() >= 5:
+        day -= pd.Timedelta(days=1)
+    return day
+
+
+def stale_symbols(symbols=None, session: pd.Timestamp = None) -> list:
+    """Stored symbols whose last date is before ``session`` (default: the latest completed one)."""
+    session = session if session is not None else last_session()
+    stale = []
+    for s in symbols or STORE.symbols():
+        try:
+            last = STORE.meta(s)["last"]
+        except FileNotFoundError:
+            continue
+        if last is None or pd.Timestamp(last) < session:
+            stale.append(s)
+    return stale
+
+
+class RefreshScheduler:
+    """Polls for stale symbols and refreshes them; a symbol still behind is retried with backoff."""
+
+    def __init__(self, symbols=None, rate_per_min: float = REFRESH_RATE, workers: int = 2,
+                 poll_s: float = REFRESH_POLL_S, log=print):
+        self.symbols = symbols
+        self.rate_per_min = rate_per_min
+        self.workers = workers
+        self.poll_s = poll_s
+        self.log = log
+        # symbol -> (session, tries, next try) for symbols still behind after a refresh;
+        # a holiday or a delisted ticker stays "stale" and must not be re-fetched on every poll
+        self._behind = {}
+
+    def _due(self, symbol: str, session: pd.Timestamp, now: datetime) -> bool:
+        entry = self._behind.get(symbol)
+        if entry is None or entry[0] != session:
+            return True
+        _, tries, next_at = entry
+        return tries < REFRESH_MAX_TRIES and now >= next_at
+
+    def run_once(self, now: datetime = None) -> list:
+        """Refresh what is stale and due now; returns the symbols that were updated."""
+        now = now.astimezone(MARKET_TZ) if now else datetime.now(MARKET_TZ)
+        session = last_session(now)
+        todo = [s for s in stale_symbols(self.symbols, session) if self._due(s, session, now)]
+        if not todo:
+            return []
+        self.log(f"refreshing {len(todo)} symbols for session {session.date()}")
+        state = prime(todo, rate_per_min=self.rate_per_min, workers=self.workers,
+                      max_tries=3, log=self.log)
+        # only a store that reached the session is done; the rest (bars not published
+        # yet, failed calls) wait poll_s, 2 * poll_s, ... before the next try
+        behind = set(stale_symbols(todo, session))
+        for s in todo:
+            if s not in behind:
+                self._behind.pop(s, None)
+                continue
+            entry = self._behind.get(s)
+            tries = entry[1] + 1 if entry is not None and entry[0] == session else 1
+            delay = min(REFRESH_RETRY_CAP_S, self.poll_s * 2 ** (tries - 1))
+            self._behind[s] = (session, tries, now + timedelta(seconds=delay))
+        if behind:
+            self.log(f"{len(behind)} symbols still end before {session.date()}; retrying later")
+        refreshed = sorted(state.done)
+        if refreshed:
+            # derived series (across cores) and the shared arena are rebuilt here, once,
+            # not by every worker
+            precompute_all(refreshed, log=self.log)
+            build_arena()
+        return refreshed
+
+    def run_forever(self, stop: threading.Event = None) -> None:
+        stop = stop or threading.Event()
+        while not stop.is_set():
+            try:
+                self.run_once()
+            except Exception as e:   # keep polling; the next round retries
+                self.log(f"refresh round failed: {e}")
+            stop.wait(self.poll_s)
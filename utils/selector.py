@@ -0,0 +1,46 @@
+"""
+Searchable ticker dropdown backed by the symbol registry.
+
+The layout only carries options for the selected symbols; as the user types,
+a server callback returns one page of matches, so the universe can grow to
+thousands of symbols without shipping them all with every page.
+"""
+from dash import callback, dcc, Input, Output, State
+
+from utils.registry import PAGE_SIZE, lookup, search
+
+
+def _option(record: dict) -> dict:
+    label = f"{record['symbol']} · {record['name']}" if record["name"] else record["symbol"]
+    if not record["rows"]:
+        label += " (not cached)"
+    return {"label": label, "value": record["symbol"]}
+
+
+def _selected(value) -> list:
+    values = value if isinstance(value, list) else [value] if value else []
+    return [_option(lookup(v) or {"symbol": v, "name": "", "rows": 1}) for v in values]
+
+
+def options_for(query: str, value=None, page_size: int = PAGE_SIZE) -> list:
+    """Selected symbols first, then one page of matches for ``query``."""
+    opts = _selected(value)
+    chosen = {o["value"] for o in opts}
+    records, total = search(query, page_size=page_size)
+    opts += [_option(r) for r in records if r["symbol"] not in chosen]
+    if total > len(records):
+        opts.append({"label": f"… {total - len(records)} more, keep typing", "value": "", "disabled": True})
+    return opts
+
+
+def symbol_dropdown(id: str, value, multi: bool = False, **kwargs) -> dcc.Dropdown:
+    """dcc.Dropdown holding only the selected symbols; call register_search(id) once per page."""
+    return dcc.Dropdown(id=id, value=value, multi=multi, options=_selected(value),
+                        placeholder="Search ticker or company", **kwargs)
+
+
+def register_search(id: str) -> None:
+    """Serve the dropdown's options from the registry as the user types."""
+    @callback(Output(id, "options"), Input(id, "search_value"), State(id, "value"))
+    def _search(query, value):
+        return options_for(query, value)
@@ -0,0 +1,293 @@
+import json
+import os
+import threading
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:          # Windows: store updates are only serialized within a process
+    fcntl = None
+
+# One typed file per symbol: date index + open/high/low/close/volume.
+# The close-only views read the "close" column from the same file.
+COLUMNS = ["open", "high", "low", "close", "volume"]
+DTYPES = {"open": "float32", "high": "float32", "low": "float32",
+          "close": "float32", "volume": "int64"}
+
+
+class CsvBackend:
+    """Plain CSV; always available, slowest to parse."""
+    ext = ".csv"
+
+    def read(self, path: str, columns=None) -> pd.DataFrame:
+        # column selection happens after coerce() so legacy files without volume still load
+        return pd.read_csv(path, parse_dates=["date"], index_col="date")
+
+    def write(self, df: pd.DataFrame, path: str) -> None:
+        df.to_csv(path, index_label="date")
+
+
+class ParquetBackend:
+    """Columnar Parquet via pyarrow; keeps dtypes and the datetime index."""
+    ext = ".parquet"
+
+    def read(self, path: str, columns=None) -> pd.DataFrame:
+        return pd.read_parquet(path, columns=columns)
+
+    def write(self, df: pd.DataFrame, path: str) -> None:
+        df.to_parquet(path)
+
+
+class FeatherBackend:
+    """Arrow IPC (Feather v2); fastest reads, no index support so date is a column."""
+    ext = ".feather"
+
+    def read(self, path: str, columns=None) -> pd.DataFrame:
+        cols = ["date", *columns] if columns else None
+        return pd.read_feather(path, columns=cols).set_index("date")
+
+    def write(self, df: pd.DataFrame, path: str) -> None:
+        df.reset_index().to_feather(path)
+
+
+BACKENDS = {"csv": CsvBackend, "parquet": ParquetBackend, "feather": FeatherBackend}
+
+
+def _default_backend() -> str:
+    try:
+        import pyarrow  # noqa: F401
+        return "parquet"
+    except ImportError:
+        return "csv"
+
+
+def coerce(df: pd.DataFrame) -> pd.DataFrame:
+    """Return a frame in store layout: sorted unique DatetimeIndex + typed OHLCV columns."""
+    df = df.copy()
+    if "date" in df.columns:
+        df = df.set_index("date")
+    df.index = pd.to_datetime(df.index, errors="coerce")
+    df.index.name = "date"
+    for col in COLUMNS:
+        if col not in df.columns:
+            df[col] = 0 if col == "volume" else float("nan")
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    df = df[df.index.notna()].dropna(subset=["close"])
+    df["volume"] = df["volume"].fillna(0)
+    df = df[COLUMNS].astype(DTYPES)
+    df = df[~df.index.duplicated(keep="last")].sort_index()
+    return df
+
+
+class PriceStore:
+    """Per-symbol OHLCV files under ``root`` using a pluggable backend."""
+
+    def __init__(self, root: str, backend: str = None):
+        self.root = root
+        name = backend or os.getenv("PRICE_STORE") or _default_backend()
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown PRICE_STORE backend {name!r}; expected one of {sorted(BACKENDS)}")
+        self.backend_name = name
+        self.backend = BACKENDS[name]()
+        os.makedirs(root, exist_ok=True)
+        self._index = None            # (mtime, {symbol: meta})
+        self._version = None          # (mtime, counter)
+        self._index_lock = threading.Lock()
+
+    def path(self, symbol: str) -> str:
+        return os.path.join(self.root, f"{symbol}_daily_ohlc{self.backend.ext}")
+
+    def _legacy_paths(self, symbol: str):
+        # Old layout: an OHLC CSV plus a duplicate close-only CSV.
+        return [os.path.join(self.root, f"{symbol}_daily_ohlc.csv"),
+                os.path.join(self.root, f"{symbol}_daily.csv")]
+
+    def exists(self, symbol: str) -> bool:
+        return os.path.exists(self.path(symbol)) or self._migrate(symbol)
+
+    def mtime(self, symbol: str):
+        try:
+            return os.stat(self.path(symbol)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def read(self, symbol: str, columns=None) -> pd.DataFrame:
+        """Typed frame indexed by date; raises FileNotFoundError if the symbol is not stored."""
+        if not self.exists(symbol):
+            raise FileNotFoundError(self.path(symbol))
+        df = self.backend.read(self.path(symbol), columns=columns)
+        if self.backend_name == "csv":
+            df = coerce(df)[columns or COLUMNS]
+        return df
+
+    def write(self, symbol: str, df: pd.DataFrame) -> pd.DataFrame:
+        """Replace ``symbol``'s file atomically (temp file + rename), so readers never see a partial file."""
+        df = coerce(df)
+        tmp = f"{self.path(symbol)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            self.backend.write(df, tmp)
+            os.replace(tmp, self.path(symbol))
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        self._update_index(symbol, df)
+        self._bump_version()
+        return df
+
+    # --- data version: a counter bumped on every write, for caches that key on "any data changed"
+
+    def _version_path(self) -> str:
+        return os.path.join(self.root, "_version")
+
+    def version(self) -> int:
+        """Monotonic store version (0 before the first write); one stat when unchanged."""
+        try:
+            mtime = os.stat(self._version_path()).st_mtime_ns
+        except FileNotFoundError:
+            return 0
+        if self._version is None or self._version[0] != mtime:
+            with open(self._version_path()) as f:
+                self._version = (mtime, int(f.read().strip() or 0))
+        return self._version[1]
+
+    @contextmanager
+    def _locked(self):
+        """Serialize index/version updates across threads and, where flock exists, processes."""
+        with self._index_lock, open(os.path.join(self.root, "_store.lock"), "a") as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)   # the scheduler and prime script write too
+            yield
+
+    def _bump_version(self) -> int:
+        with self._locked():
+            self._version = None
+            version = self.version() + 1
+            tmp = f"{self._version_path()}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                f.write(str(version))
+            os.replace(tmp, self._version_path())
+        return version
+
+    # --- metadata index: symbol -> first/last date and row count, without reading prices
+
+    def _index_path(self) -> str:
+        return os.path.join(self.root, "_index.json")
+
+    def _read_index(self) -> dict:
+        try:
+            mtime = os.stat(self._index_path()).st_mtime_ns
+        except FileNotFoundError:
+            return {}
+        if self._index is None or self._index[0] != mtime:
+            with open(self._index_path()) as f:
+                self._index = (mtime, json.load(f))
+        return self._index[1]
+
+    def index_mtime(self):
+        """mtime (ns) of the metadata index, or None; changes on every write."""
+        try:
+            return os.stat(self._index_path()).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _update_index(self, symbol: str, df: pd.DataFrame) -> dict:
+        entry = {"first": df.index.min().strftime("%Y-%m-%d") if len(df) else None,
+                 "last": df.index.max().strftime("%Y-%m-%d") if len(df) else None,
+                 "rows": int(len(df)), "mtime": self.mtime(symbol)}
+        with self._locked():
+            index = dict(self._read_index())
+            index[symbol] = entry
+            tmp = f"{self._index_path()}.{os.getpid()}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(index, f, indent=1, sort_keys=True)
+            os.replace(tmp, self._index_path())
+        return entry
+
+    def meta(self, symbol: str) -> dict:
+        """{"first", "last", "rows", "mtime"} for ``symbol``; rebuilt from the file if stale."""
+        entry = self._read_index().get(symbol)
+        if entry and entry["mtime"] == self.mtime(symbol):
+            return entry
+        if not self.exists(symbol):
+            raise FileNotFoundError(self.path(symbol))
+        entry = self._read_index().get(symbol)   # a migration may have just written it
+        if entry and entry["mtime"] == self.mtime(symbol):
+            return entry
+        return self._update_index(symbol, self.read(symbol, columns=["close"]))
+
+    def _migrate(self, symbol: str) -> bool:
+        """Convert a legacy CSV into the active backend. Returns True if a file was written."""
+        for legacy in self._legacy_paths(symbol):
+            if legacy == self.path(symbol) or not os.path.exists(legacy):
+                continue
+            self.write(symbol, pd.read_csv(legacy, parse_dates=["date"]))
+            return True
+        return False
+
+    def migrate_all(self, remove_legacy: bool = False) -> list:
+        """Migrate every legacy CSV in ``root``; optionally delete the CSVs afterwards."""
+        done = []
+        for name in sorted(os.listdir(self.root)):
+            if not name.endswith(".csv"):
+                continue
+            symbol = name.split("_daily")[0]
+            if symbol in done:
+                continue
+            if os.path.exists(self.path(symbol)) or self._migrate(symbol):
+                done.append(symbol)
+            if remove_legacy:
+                for legacy in self._legacy_paths(symbol):
+                    if legacy != self.path(symbol) and os.path.exists(legacy):
+                        os.remove(legacy)
+        return done
+
+    # --- derived series (vol cubes, indicators...) stamped with the source file's mtime
+
+    def derived_path(self, symbol: str, name: str) -> str:
+        return os.path.join(self.root, "derived", f"{symbol}_{name}.npz")
+
+    def write_derived(self, symbol: str, name: str, df: pd.DataFrame, stamp: int = None) -> None:
+        """
+        Save a date-indexed frame derived from ``symbol``; dtypes are kept as-is (e.g. float16).
+        ``stamp`` is the price mtime the frame was computed from (default: the current one);
+        pass the mtime read before loading the prices so a concurrent refresh is not masked.
+        """
+        path = self.derived_path(symbol, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.tmp.npz"
+        stamp = (self.mtime(symbol) or 0) if stamp is None else stamp
+        np.savez(tmp, dates=df.index.values.astype("datetime64[D]"), values=df.to_numpy(),
+                 columns=np.asarray([str(c) for c in df.columns]), stamp=np.int64(stamp))
+        os.replace(tmp, path)
+
+    def derived_fresh(self, symbol: str, name: str) -> bool:
+        """True if the saved series exists and matches the symbol's current prices (reads only the stamp)."""
+        path = self.derived_path(symbol, name)
+        if not os.path.exists(path):
+            return False
+        try:
+            with np.load(path) as z:
+                return int(z["stamp"]) == (self.mtime(symbol) or 0)
+        except (OSError, ValueError, KeyError):
+            return False
+
+    def read_derived(self, symbol: str, name: str):
+        """The saved frame, or None if missing or older than the symbol's current prices."""
+        path = self.derived_path(symbol, name)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as z:
+            if int(z["stamp"]) != (self.mtime(symbol) or 0):
+                return None
+            return pd.DataFrame(z["values"], index=pd.DatetimeIndex(z["dates"], name="date"),
+                                columns=list(z["columns"]))
+
+    def symbols(self) -> list:
+        suffix = f"_daily_ohlc{self.backend.ext}"
+        found = {n[: -len(suffix)] for n in os.listdir(self.root) if n.endswith(suffix)}
+        for n in os.listdir(self.root):
+            if n.endswith(".csv") and "_daily" in n:
+                found.add(n.split("_daily")[0])
+        return sorted(found)
@@ -0,0 +1,56 @@
+"""
+Rolling annualized volatility for every position of the /volatility slider.
+
+The cube for a symbol (dates x VOL_WINDOWS, float16) is computed once from the
+full close history, saved next to the prices and reused until that symbol's
+prices change; the callback then only slices it.
+"""
+import numpy as np
+import pandas as pd
+
+from utils.analytics import ANN_FACTOR, align, returns, rolling_std_windows, rolling_vol, window_bounds
+from utils.data import STORE, _cached, fetch_daily
+
+VOL_WINDOWS = tuple(range(10, 121, 5))   # matches dcc.Slider(min=10, max=120, step=5)
+
+
+def _compute(symbol: str) -> pd.DataFrame:
+    return cube_from_close(STORE.read(symbol, columns=["close"])["close"])
+
+
+def cube_from_close(close: pd.Series) -> pd.DataFrame:
+    """date x window annualized rolling vol from a date-indexed close series."""
+    cube = rolling_std_windows(returns(close.to_numpy(np.float64)), VOL_WINDOWS)[:, :, 0] * ANN_FACTOR
+    # float16 keeps ~3 significant digits, plenty for a percentage axis, at a quarter of float64
+    return pd.DataFrame(cube.T.astype(np.float16), index=close.index, columns=[str(w) for w in VOL_WINDOWS])
+
+
+def vol_cube(symbol: str) -> pd.DataFrame:
+    """date x window frame of annualized rolling vol for ``symbol`` (cached in memory and on disk)."""
+    def build():
+        if not STORE.exists(symbol):
+            fetch_daily(symbol)   # fetch on first use, same as the price views
+        cube = STORE.read_derived(symbol, "volcube")
+        if cube is None:
+            stamp = STORE.mtime(symbol)   # read before the prices: a racing refresh leaves it stale
+            cube = _compute(symbol)
+            STORE.write_derived(symbol, "volcube", cube, stamp=stamp)
+        return cube
+    return _cached(symbol, "volcube", build)
+
+
+def vol_panel(symbols, window: int, start=None, end=None):
+    """(dates, matrix) of rolling vol for ``symbols`` over start..end, one column per symbol."""
+    parts = []
+    for s in symbols:
+        if window in VOL_WINDOWS:
+            col = vol_cube(s)[str(window)]
+            dates, vol = col.index.values.astype("datetime64[D]"), col.to_numpy(np.float64)
+        else:
+            # off-grid window: compute directly from the full close history
+            df = fetch_daily(s)
+            dates = df["date"].to_numpy().astype("datetime64[D]")
+            vol = rolling_vol(df["close"].to_numpy(np.float64), window)[:, 0]
+        lo, hi = window_bounds(dates, start, end)
+        parts.append((dates[lo:hi], vol[lo:hi]))
+    return align(parts)